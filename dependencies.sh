@@ -1,9 +1,14 @@
 #!/bin/bash
 # sudo apt update
-# sudo apt install python3-flask python3-flask-login python3-flask-sqlalchemy python3-mysql.connector python3-werkzeug python3-dotenv
+# sudo apt install python3-flask python3-flask-login python3-flask-sqlalchemy python3-mysql.connector python3-werkzeug python3-dotenv python3-numpy python3-brotli python3-pil
 
 # For a .venv environment uncomment bellow
 python3 -m venv venv
 source venv/bin/activate
-pip install gunicorn flask mysql-connector-python python-dotenv
+pip install gunicorn flask mysql-connector-python python-dotenv numpy brotli pillow
+# the app needs every schema migration applied (users.staff_id, ErrorLogs,
+# MemberExerciseStats, RevenueDaily, ...), don't start it on an old schema
+python -m website.migrations || exit 1
+python -m website.images
+python -m website.assets
 gunicorn --bind 127.0.0.1:5000 main:app
@@ -0,0 +1,52 @@
+# ======================================================================= #
+#                     GYMMAN: QUERY PLAN CHECK (pytest)                   #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (test_explain.py) runs website.explain's PROBES under pytest, #
+# so CI fails when a db_* model starts scanning a whole table. The plan   #
+# checks need a database filled by `python -m website.seed` (db.env or    #
+# DB_* in the environment) and only run with EXPLAIN_SEEDED_DB=1, without #
+# it they're skipped. EXPLAIN_MIN_ROWS overrides --min-rows (1000).       #
+# Run from the repo root: python -m pytest tests                          #
+# ======================================================================= #
+
+import os
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("numpy")
+
+from website import explain
+
+SEEDED = os.getenv("EXPLAIN_SEEDED_DB") == "1"
+MIN_ROWS = int(os.getenv("EXPLAIN_MIN_ROWS", 1000))
+
+needs_db = pytest.mark.skipif(not SEEDED, reason="no seeded database (set EXPLAIN_SEEDED_DB=1)")
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    errors = []
+    statements = explain.record_statements(explain.sample_ids(), errors)
+    return statements, errors
+
+
+def test_every_model_has_a_probe():
+    missing, stale = explain.unprobed()
+    assert not missing, f"add PROBES entries in explain.py for {missing}"
+    assert not stale, f"PROBES entries for models that no longer exist: {stale}"
+
+@needs_db
+def test_probes_run(recorded):
+    _, errors = recorded
+    assert not errors, "; ".join(f"{name}: {type(e).__name__}: {e}" for name, e in errors)
+
+@needs_db
+def test_no_full_table_scans(recorded):
+    statements, _ = recorded
+    scans = [f"{name}: table {step['table']} (~{step.get('rows')} rows) in "
+             + " ".join(sql.split())[:200]
+             for name, sql, step, allowed in explain.explain(statements, MIN_ROWS)
+             if not allowed]
+    assert not scans, "\n".join(scans)
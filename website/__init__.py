@@ -11,9 +11,18 @@ def create_app():
 
     from .views import views
     from .auth import auth
+    from .downloads import downloads
+    from . import pool, instrument, errorlog, assets, images
+
+    pool.init_app(app)
+    instrument.init_app(app)
+    errorlog.init_app(app)
+    assets.init_app(app)
+    images.init_app(app)
 
     app.register_blueprint(views, url_prefix='/')
     app.register_blueprint(auth, url_prefix='/')
+    app.register_blueprint(downloads, url_prefix='/')
 
     return app
 
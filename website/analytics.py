@@ -0,0 +1,178 @@
+# ======================================================================= #
+#                       GYMMAN: PROGRESS ANALYTICS                        #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (analytics.py) builds the progress reports shown to trainers  #
+# (and later members). A member's whole exercise history comes back from  #
+# ONE query (db_getExerciseHistory, strength + run details joined in),    #
+# for one member or every client of a trainer at once, and is turned      #
+# into NumPy columns. The stats are computed over those arrays:           #
+#                                                                         #
+#   - average RPE + a rolling average over the last RPE_WINDOW workouts   #
+#   - estimated 1RM per lift (Epley: weight * (1 + reps / 30)), in kg     #
+#   - weekly strength volume (weight * sets * reps, weeks start Monday)   #
+#   - run pace (sec / km) and its trend in sec / km per week              #
+#                                                                         #
+# So a trainer with 60 clients costs one query, not 3 aggregates each.    #
+# ======================================================================= #
+
+import os
+from datetime import timedelta
+
+import numpy as np
+
+from .models import db_getExerciseHistory
+
+RPE_WINDOW = int(os.getenv("RPE_WINDOW", 5))
+VOLUME_WEEKS = 8        # weeks of volume shown on a report
+
+_TO_KG = {"kg": 1.0, "kgs": 1.0, "lb": 0.45359237, "lbs": 0.45359237}
+_TO_KM = {"km": 1.0, "m": 0.001, "mi": 1.609344, "mile": 1.609344, "miles": 1.609344}
+
+
+def _float(value):
+    return np.nan if value is None else float(value)
+
+# time_taken as seconds: TIME columns come back as timedelta, plain numbers
+# are minutes (what the log form asks for)
+def _seconds(value):
+    if value is None:
+        return np.nan
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, str) and ":" in value:
+        seconds = 0.0
+        for part in value.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    return float(value) * 60
+
+# rows from db_getExerciseHistory -> dict of equal length arrays
+def _columns(rows):
+    n = len(rows)
+    cols = {
+        "member_id": np.empty(n, dtype=np.int64),
+        "day": np.empty(n, dtype="datetime64[D]"),
+        "name": np.empty(n, dtype=object),
+        "rpe": np.empty(n),
+        "weight": np.empty(n),      # kg, nan for non strength work
+        "sets": np.empty(n),
+        "reps": np.empty(n),
+        "seconds": np.empty(n),     # cardio time, nan otherwise
+        "km": np.empty(n),          # run distance, nan otherwise
+    }
+    for i, (member_id, day, name, rpe, weight, weight_unit, sets, reps,
+            time_taken, distance, distance_unit) in enumerate(rows):
+        cols["member_id"][i] = member_id
+        cols["day"][i] = day
+        cols["name"][i] = (name or "").strip().lower()
+        cols["rpe"][i] = _float(rpe)
+        cols["weight"][i] = _float(weight) * _TO_KG.get((weight_unit or "kg").lower(), 1.0)
+        cols["sets"][i] = _float(sets)
+        cols["reps"][i] = _float(reps)
+        cols["seconds"][i] = _seconds(time_taken)
+        cols["km"][i] = _float(distance) * _TO_KM.get((distance_unit or "km").lower(), 1.0)
+    return cols
+
+def _rolling_mean(values, window):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return values
+    sums = np.cumsum(np.insert(values, 0, 0.0))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return (sums[1:] - sums[np.maximum(np.arange(1, len(values) + 1) - window, 0)]) / counts
+
+def _week_start(days):
+    # 1970-01-01 was a Thursday, so (days + 3) % 7 is 0 on Mondays
+    as_int = days.astype(np.int64)
+    return (as_int - (as_int + 3) % 7).astype("datetime64[D]")
+
+def _round(value, digits=1):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+def _lift_stats(c):
+    lifting = ~np.isnan(c["weight"]) & (c["weight"] > 0)
+    if not lifting.any():
+        return []
+    reps = np.nan_to_num(c["reps"][lifting], nan=1.0)
+    e1rm = np.where(reps <= 1, c["weight"][lifting], c["weight"][lifting] * (1 + reps / 30))
+    names, inverse = np.unique(c["name"][lifting].astype(str), return_inverse=True)
+    best = np.full(len(names), -np.inf)
+    np.maximum.at(best, inverse, e1rm)
+    # rows are in date order, so each lift's highest row index is its latest
+    last = np.zeros(len(names), dtype=np.int64)
+    np.maximum.at(last, inverse, np.arange(len(inverse)))
+    latest = e1rm[last]
+    sessions = np.bincount(inverse, minlength=len(names))
+    lifts = [{"lift": name, "best_e1rm": _round(b), "latest_e1rm": _round(l), "sessions": int(s)}
+             for name, b, l, s in zip(names, best, latest, sessions)]
+    return sorted(lifts, key=lambda lift: -lift["best_e1rm"])
+
+def _weekly_volume(c):
+    volume = c["weight"] * np.nan_to_num(c["sets"], nan=1.0) * np.nan_to_num(c["reps"], nan=1.0)
+    lifting = ~np.isnan(volume)
+    if not lifting.any():
+        return []
+    weeks, inverse = np.unique(_week_start(c["day"][lifting]), return_inverse=True)
+    totals = np.bincount(inverse, weights=volume[lifting], minlength=len(weeks))
+    return [{"week": str(w), "volume_kg": _round(v, 0)}
+            for w, v in zip(weeks[-VOLUME_WEEKS:], totals[-VOLUME_WEEKS:])]
+
+def _run_stats(c):
+    runs = ~np.isnan(c["km"]) & (c["km"] > 0)
+    if not runs.any():
+        return None
+    km = c["km"][runs]
+    pace = c["seconds"][runs] / km      # sec / km, nan if no time was logged
+    timed = ~np.isnan(pace)
+    trend = None
+    if timed.sum() >= 2:
+        days = c["day"][runs][timed].astype(np.int64).astype(float)
+        if np.ptp(days) > 0:
+            # least squares slope, sec/km per day -> per week (negative is faster)
+            trend = np.polyfit(days, pace[timed], 1)[0] * 7
+    return {
+        "runs": int(runs.sum()),
+        "avg_km": _round(km.mean(), 2),
+        "total_km": _round(km.sum(), 2),
+        "avg_pace": _round(np.nanmean(pace)) if timed.any() else None,
+        "latest_pace": _round(pace[timed][-1]) if timed.any() else None,
+        "pace_trend": _round(trend),
+    }
+
+def _report(c):
+    rpe = c["rpe"]
+    rolling = _rolling_mean(rpe, RPE_WINDOW)
+    return {
+        "workouts": int(len(rpe)),
+        "first_workout": c["day"][0].item(),
+        "last_workout": c["day"][-1].item(),
+        "avg_rpe": _round(np.nanmean(rpe)) if (~np.isnan(rpe)).any() else None,
+        "rolling_rpe": _round(rolling[-1]) if len(rolling) else None,
+        "rpe_trend": [_round(v) for v in rolling[-10:]],
+        "max_weight": _round(np.nanmax(c["weight"])) if (~np.isnan(c["weight"])).any() else None,
+        "lifts": _lift_stats(c),
+        "weekly_volume": _weekly_volume(c),
+        "running": _run_stats(c),
+    }
+
+# {member_id: report} for every member in member_ids that has logged a
+# workout, from a single query. members with no history are left out
+def progress_reports(member_ids, since=None):
+    member_ids = sorted({int(m) for m in member_ids})
+    if not member_ids:
+        return {}
+    rows = db_getExerciseHistory(member_ids, since=since)
+    if not rows:
+        return {}
+    cols = _columns(rows)
+    # rows come back sorted by member, so each member is one contiguous slice
+    ids, starts = np.unique(cols["member_id"], return_index=True)
+    bounds = list(starts[1:]) + [len(rows)]
+    reports = {}
+    for member_id, start, stop in zip(ids, starts, bounds):
+        reports[int(member_id)] = _report({k: v[start:stop] for k, v in cols.items()})
+    return reports
+
+def member_report(member_id, since=None):
+    return progress_reports([member_id], since=since).get(int(member_id))
@@ -0,0 +1,231 @@
+# ======================================================================= #
+#                           STATIC ASSET BUILD                            #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (assets.py) turns website/static into cache-forever files.    #
+# `python -m website.assets` (run it on every deploy) writes, for each    #
+# stylesheet / script / image / font:                                     #
+#                                                                         #
+#   static/dist/<path>/<name>.<content hash>.<ext>   (CSS minified)       #
+#   ... .gz / .br next to the text ones (brotli if the package is there)  #
+#   static/dist/manifest.json   {"styles.css": "dist/styles.1f2e...css"}  #
+#                                                                         #
+# init_app() loads the manifest, so url_for('static', filename=...)       #
+# hands out the hashed name, and anything under /static/dist/ goes out    #
+# with Cache-Control: immutable (+ the precompressed variant the browser  #
+# accepts). A changed file gets a new name, so repeat views never ask.    #
+# No manifest (dev checkout) = plain names, same as before.               #
+# The build before this one stays on disk (manifest.prev.json lists it):  #
+# workers still running on the old manifest keep serving its files until  #
+# they're restarted. Anything older is deleted.                           #
+#                                                                         #
+# Nginx serves /static/ itself, give it the same treatment:               #
+#   location /static/dist/ {                                              #
+#       gzip_static on; brotli_static on;                                 #
+#       add_header Cache-Control "public, max-age=31536000, immutable";   #
+#   }                                                                     #
+# ======================================================================= #
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:     # optional, .gz only without it
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+DIST = "dist"
+MANIFEST = os.path.join(STATIC_DIR, DIST, "manifest.json")
+PREVIOUS = os.path.join(STATIC_DIR, DIST, "manifest.prev.json")
+HASH_LENGTH = 12
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# what gets hashed. PDFs keep their names, they're downloads
+HASHED = {".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".avif",
+          ".woff", ".woff2"}
+COMPRESSED = {".css", ".js", ".svg", ".json", ".txt"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# directories under dist/ that another build owns (images.py)
+FOREIGN = ("img",)
+
+# a quoted string (group 1, kept as written) or a comment (dropped)
+_TOKEN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.DOTALL)
+_SPACE = re.compile(r"\s+")
+_PUNCT = re.compile(r"\s*([{};,>])\s*")
+_URL = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+
+
+def _squeeze(css):
+    css = _SPACE.sub(" ", css)
+    css = _PUNCT.sub(r"\1", css)
+    css = re.sub(r":\s+", ":", css)     # "color: red" -> "color:red"
+    return css.replace(";}", "}")
+
+def minify_css(css):
+    # only the code between strings is squeezed: content: " > ", font names,
+    # url("a b.png") go out untouched
+    out = []
+    pos = 0
+    for match in _TOKEN.finditer(css):
+        out.append(_squeeze(css[pos:match.start()]))
+        out.append(match.group(1) or "")
+        pos = match.end()
+    out.append(_squeeze(css[pos:]))
+    return "".join(out).strip()
+
+def _hashed_name(name, content):
+    stem, ext = posixpath.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+def _sources():
+    for root, dirs, files in os.walk(STATIC_DIR):
+        rel_root = os.path.relpath(root, STATIC_DIR)
+        if rel_root == DIST or rel_root.startswith(DIST + os.sep):
+            dirs[:] = []
+            continue
+        for filename in sorted(files):
+            name = posixpath.normpath(posixpath.join(rel_root.replace(os.sep, "/"), filename))
+            if posixpath.splitext(name)[1].lower() in HASHED:
+                yield name
+
+def _rewrite_urls(name, css, manifest):
+    # url(images/x.png) inside a stylesheet -> the hashed file, relative to
+    # where the hashed stylesheet ends up
+    def swap(match):
+        quote, url = match.groups()
+        if "://" in url or url.startswith(("data:", "/", "#")):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(name), url))
+        if target not in manifest:
+            return match.group(0)
+        new = posixpath.relpath(manifest[target], posixpath.join(DIST, posixpath.dirname(name)))
+        return f"url({quote}{new}{quote})"
+    return _URL.sub(swap, css)
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+def _write_compressed(path, content):
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    for suffix, packed in variants.items():
+        if len(packed) < len(content):
+            _write(path + suffix, packed)
+
+def build():
+    """Write static/dist + its manifest, returns {source: hashed}."""
+    names = list(_sources())
+    contents = {}
+    for name in names:
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            contents[name] = f.read()
+    previous = load_manifest()
+    manifest = {}
+    # stylesheets last so their url()s can point at hashed images
+    ordered = sorted(names, key=lambda n: n.endswith(".css"))
+    for name in ordered:
+        content = contents[name]
+        if name.endswith(".css"):
+            content = _rewrite_urls(name, minify_css(content.decode("utf-8")), manifest).encode()
+        manifest[name] = posixpath.join(DIST, _hashed_name(name, content))
+        path = os.path.join(STATIC_DIR, *manifest[name].split("/"))
+        if not os.path.exists(path):
+            _write(path, content)
+            if posixpath.splitext(name)[1].lower() in COMPRESSED:
+                _write_compressed(path, content)
+    # a rebuild with nothing changed keeps the older previous build
+    if previous and previous != manifest:
+        _write(PREVIOUS, json.dumps(previous, indent=2, sort_keys=True).encode())
+    _write(MANIFEST, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _prune(manifest)
+    return manifest
+
+def _prune(manifest):
+    # drop hashed files neither this build nor the one before points at
+    keep = {os.path.join(STATIC_DIR, *p.split("/"))
+            for m in (manifest, load_manifest(PREVIOUS)) for p in m.values()}
+    keep |= {p + suffix for p in keep for _, suffix in ENCODINGS}
+    keep |= {MANIFEST, PREVIOUS}
+    for root, dirs, files in os.walk(os.path.join(STATIC_DIR, DIST)):
+        if root == os.path.join(STATIC_DIR, DIST):
+            dirs[:] = [d for d in dirs if d not in FOREIGN]
+        for filename in files:
+            path = os.path.join(root, filename)
+            if path not in keep:
+                os.remove(path)
+
+def load_manifest(path=MANIFEST):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _stale(manifest):
+    built = os.path.getmtime(MANIFEST)
+    return [name for name in manifest
+            if os.path.exists(os.path.join(STATIC_DIR, name))
+            and os.path.getmtime(os.path.join(STATIC_DIR, name)) > built]
+
+def init_app(app):
+    manifest = load_manifest() if os.getenv("STATIC_MANIFEST", "1") == "1" else {}
+    if manifest:
+        stale = _stale(manifest)
+        if stale:
+            log.warning("static files changed since the last asset build (%s), "
+                        "run `python -m website.assets`", ", ".join(stale[:5]))
+    app.extensions["asset_manifest"] = manifest
+
+    @app.url_defaults
+    def hashed_static(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    send_static = app.view_functions["static"]
+
+    def static(filename):
+        if not filename.startswith(DIST + "/"):
+            return send_static(filename=filename)
+        mimetype = mimetypes.guess_type(filename)[0]
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings[encoding] and \
+                    os.path.isfile(os.path.join(STATIC_DIR, *(filename + suffix).split("/"))):
+                response = send_from_directory(STATIC_DIR, filename + suffix, mimetype=mimetype)
+                response.headers["Content-Encoding"] = encoding
+                break
+        if response is None:
+            response = send_from_directory(STATIC_DIR, filename)
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.vary.add("Accept-Encoding")
+        return response
+
+    app.view_functions["static"] = static
+
+def main(argv=None):
+    manifest = build()
+    total = sum(os.path.getsize(os.path.join(STATIC_DIR, n)) for n in manifest)
+    built = sum(os.path.getsize(os.path.join(STATIC_DIR, *p.split("/"))) for p in manifest.values())
+    print(f"{len(manifest)} assets -> static/{DIST}/ ({total} -> {built} bytes"
+          f"{'' if brotli else ', no brotli module: .gz only'})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -11,14 +11,28 @@
 #  A live web demo can be found @ https://isaacstephens.com/gymman-login. #
 # ======================================================================= #
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import (Blueprint, render_template, request, redirect, url_for, session, flash,
+                   make_response, stream_template, stream_with_context, Response, jsonify)
 from werkzeug.security import check_password_hash, generate_password_hash
-from datetime import timedelta
+from datetime import datetime, timedelta
+import re
 from .models import *
+from .export import EXPORT_FORMATS
+from . import instrument, errorlog, analytics
 
 auth = Blueprint('auth', __name__)
 auth.permanent_session_lifetime = timedelta(minutes=30)
 
+# recent check-ins shown on first load, and added per "Load More" click
+CHECKIN_FIRST_PAGE = 15
+CHECKIN_PAGE_SIZE = 5
+# members per page in the owner's member directory
+MEMBERS_PER_PAGE = 50
+# most members accepted by one batch check-in
+MAX_BATCH_CHECKINS = 200
+# rows per page on the error log views
+ERRORS_PER_PAGE = 50
+
 def is_logged_in(required_role=None):
     """Verify user session and optional role."""
     if "user_id" not in session:
@@ -27,6 +41,88 @@ def is_logged_in(required_role=None):
         return False
     return True
 
+# member directory paging / sorting / filtering from the query string
+def directoryArgs():
+    sort = request.args.get("sort", "name")
+    return {
+        "page": max(request.args.get("page", 1, type=int), 1),
+        "sort": sort if sort in MEMBER_SORTS else "name",
+        "order": "desc" if request.args.get("order") == "desc" else "asc",
+        "q": request.args.get("q", "").strip(),
+    }
+
+# trainer-client relationship filters / sort / page from the query string
+def relationshipArgs():
+    sort = request.args.get("sort", "start")
+    status = request.args.get("status", "all")
+    return {
+        "trainer_id": request.args.get("trainer_id", type=int),
+        "client": request.args.get("client", "").strip(),
+        "status": status if status in RELATIONSHIP_STATUSES else "all",
+        "date_from": request.args.get("date_from") or None,   # yyyy-mm-dd
+        "date_to": request.args.get("date_to") or None,       # yyyy-mm-dd
+        "page": max(request.args.get("page", 1, type=int), 1),
+        "sort": sort if sort in RELATIONSHIP_SORTS else "start",
+        "order": "asc" if request.args.get("order") == "asc" else "desc",
+    }
+
+# payment search filters from a form / query string (search + export)
+def paymentFilters(values):
+    return {
+        "member_query": values.get("search_member", "").strip(),
+        "date_from": values.get("date_from") or None,   # yyyy-mm-dd
+        "date_to": values.get("date_to") or None,       # yyyy-mm-dd
+        "status": normalizePaymentStatus(values.get("status_filter")),
+    }
+
+# one page of error logs for the owner/staff views, filtered from the query
+# string (?since=&until=&route=&exception_type=&page=). page 1 also shows
+# errors still waiting to be written; if the DB can't be read at all the
+# in-memory ring buffer is shown instead
+def errorLogPage():
+    def _when(value):
+        try:
+            return datetime.fromisoformat(value) if value else None
+        except ValueError:
+            return None
+
+    filters = {
+        "since": _when(request.args.get("since")),
+        "until": _when(request.args.get("until")),
+        "route": request.args.get("route", "").strip() or None,
+        "exception_type": request.args.get("exception_type", "").strip() or None,
+    }
+    page = max(request.args.get("page", 1, type=int), 1)
+    from_memory = False
+    try:
+        errors, has_next = db_getErrorLog(page, ERRORS_PER_PAGE, **filters)
+        if page == 1:
+            errors = errorlog.pending(**filters) + errors
+    except Exception:
+        errors, has_next = errorlog.recent_errors(**filters), False
+        from_memory = True
+
+    return {
+        "errors": errors,
+        "has_next": has_next,
+        "page": page,
+        "filters": {k: request.args.get(k, "") for k in filters},
+        "from_memory": from_memory,
+        "dropped": errorlog.dropped(),
+    }
+
+# link the (optional) login username from an owner form to a Staff row, so
+# trainer / staff pages can find it (users.staff_id)
+def linkAccount(username, staff_id):
+    username = (username or "").strip()
+    if not username:
+        return
+    if db_linkStaffAccount(username, staff_id):
+        flash(f"Account {username} linked to staff ID {staff_id}, "
+              "it applies from their next login.")
+    else:
+        flash(f"No staff or trainer account named {username}, nothing was linked.")
+
 @auth.route('/gymman-login', methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -51,6 +147,9 @@ def login():
                 session["role"] = "member"
             session["name"] = user["first_name"] + ' ' +user["last_name"]           
             role = session["role"]
+            # resolve the Staff row once here instead of on every trainer page
+            if role in ("trainer", "staff"):
+                session["staff_id"] = db_getUserStaffId(user)
             # Redirect the user to their role-specific dashboard
             if role == "owner":
                 cursor.close()
@@ -124,9 +223,12 @@ def sign_up():
             INSERT INTO Members (first_name, last_name, email)
             VALUES (%s, %s, %s)
         """, (first_name, last_name, email)) 
+        member_id = cursor.lastrowid
         db.commit()     
         cursor.close()
         db.close()
+        invalidate_dashboard_counts()
+        member_index.upsert(member_id, first_name, last_name, email)
         flash('Account created successfully! You can now log in.')
         return redirect(url_for('auth.login'))
     return render_template("gymman_templates/sign_up.html")
@@ -150,6 +252,112 @@ def checkin():
     flash(f"{member['first_name']} {member['last_name']} checked in successfully!", "success")
     return redirect(request.referrer)
 
+# check in a whole group at once (kiosk bursts, a class arriving together).
+# takes JSON {"members": [...]} or a form field `members` (one per line /
+# comma separated). every entry is a member ID or a name; IDs are resolved in
+# one query, names through the search index, and everyone found is inserted
+# with a single multi-row INSERT + commit. answers with per-entry results
+# as JSON, or flashes a summary for form posts (owner/staff)
+@auth.route("/checkins/batch", methods=['POST'])
+def batch_checkin():
+    if not (is_logged_in("Owner") or is_logged_in("Staff")):
+        if request.is_json:
+            return jsonify(error="not logged in"), 403
+        return redirect(url_for("auth.login"))
+
+    if request.is_json:
+        body = request.get_json(silent=True)
+        entries = body.get("members") if isinstance(body, dict) else None
+        if not isinstance(entries, list):
+            return jsonify(error='Send a JSON object {"members": [...]}.'), 400
+    else:
+        entries = re.split(r"[\n,]+", request.form.get("members", ""))
+    # (as sent, text). IDs may arrive as JSON numbers; anything else that isn't
+    # a string (null, bools, floats, objects) gets text None -> "invalid"
+    entries = [(e, str(e).strip() if isinstance(e, (str, int)) and not isinstance(e, bool)
+                else None) for e in entries]
+    entries = [(e, text) for e, text in entries if text != ""]
+
+    if not entries or len(entries) > MAX_BATCH_CHECKINS:
+        message = f"Send between 1 and {MAX_BATCH_CHECKINS} members per batch."
+        if request.is_json:
+            return jsonify(error=message), 400
+        flash(message, "error")
+        return redirect(request.referrer or url_for("auth.staff_checkins"))
+
+    # ASCII digits only: str.isdigit() also takes "²" / "٣", which int() rejects
+    def member_id_of(text):
+        return int(text) if text is not None and re.fullmatch(r"[0-9]+", text) else None
+
+    # resolve: IDs in one query, names via the in-process index
+    by_id = db_findMembersByIds(member_id_of(text) for _, text in entries
+                                if member_id_of(text) is not None)
+    name_hits = {}
+    for _, text in entries:
+        if text is not None and member_id_of(text) is None:
+            ids = member_index.search(text, limit=1)
+            if ids:
+                name_hits[text] = ids[0]
+    missing_ids = set(name_hits.values()) - set(by_id)
+    if missing_ids:
+        by_id.update(db_findMembersByIds(missing_ids))
+
+    results = []
+    to_log = []
+    seen = set()
+    for entry, text in entries:
+        if text is None:
+            results.append({"input": entry, "status": "invalid",
+                            "error": "expected a member ID or a name"})
+            continue
+        member_id = member_id_of(text)
+        if member_id is None:
+            member_id = name_hits.get(text)
+        member = by_id.get(member_id)
+        if member is None:
+            results.append({"input": text, "status": "not_found"})
+            continue
+        result = {
+            "input": text,
+            "member_id": member["member_id"],
+            "name": f"{member['first_name']} {member['last_name']}",
+        }
+        if member_id in seen:
+            result["status"] = "duplicate"
+        else:
+            seen.add(member_id)
+            to_log.append(member_id)
+            result["status"] = "checked_in"
+        results.append(result)
+
+    db_logCheckins(to_log)
+
+    if request.is_json:
+        return jsonify(checked_in=len(to_log), results=results)
+    not_found = [r["input"] for r in results if r["status"] == "not_found"]
+    flash(f"Checked in {len(to_log)} member(s).", "success")
+    if not_found:
+        flash("Not found: " + ", ".join(not_found), "error")
+    return redirect(request.referrer or url_for("auth.staff_checkins"))
+
+# next page of recent check-in rows after ?before=<checkin_id>, rendered as a
+# bare <tr> fragment for the "Load More" button to append (owner/staff)
+@auth.route("/checkins/recent")
+def recent_checkins_page():
+    if not (is_logged_in("Owner") or is_logged_in("Staff")):
+        return "", 403
+    before_id = request.args.get("before", type=int)
+    if before_id is None:
+        return "", 400
+    recent_checkins = db_showRecentCheckIns(CHECKIN_PAGE_SIZE, before_id=before_id)
+    next_cursor = checkinCursor(recent_checkins, CHECKIN_PAGE_SIZE)
+
+    resp = make_response(render_template(
+        "/gymman_templates/checkin_rows.html",
+        recent_checkins=recent_checkins))
+    resp.headers["X-Next-Cursor"] = "" if next_cursor is None else str(next_cursor)
+    return resp
+
 @auth.route("/members/<int:member_id>/modify", methods=['GET', 'POST'])
 def modify_member_form(member_id):
     # Allow Owners, Staff, or Members (but members can only access themselves)
@@ -213,19 +421,16 @@ def owner_dashboard():
     if not is_logged_in("Owner"):
         return redirect(url_for("auth.login"))
     
-    total_members = db_getNumTotalMembers()
-    pending_payments = db_getNumPendingPayments()
-    total_active_trainers = db_getNumActiveTrainers()
-    total_revenue = db_aggregatePayments()
+    counts = db_getDashboardCounts()
 
     return render_template(
         "/gymman_templates/dashboard_owner.html", 
         username=session["username"], 
         name=session["name"],
-        total_members=total_members,
-        pending_payments=pending_payments,
-        total_active_trainers=total_active_trainers,
-        total_revenue=total_revenue
+        total_members=counts["total_members"],
+        pending_payments=counts["pending_payments"],
+        total_active_trainers=counts["active_trainers"],
+        total_revenue=counts["total_revenue"]
     )
 
 @auth.route("/owner/memberships", methods=['GET','POST'])
@@ -234,14 +439,9 @@ def owner_memberships():
         return redirect(url_for("auth.login"))
     
     member_lookup = None
-    num_shown = session.get("num_checkins_shown", 15)
 
     if request.method == 'POST':
-        # If "Load More" is pressed, increment by 5
-        if 'load_more' in request.form:
-            num_shown += 5
-            session["num_checkins_shown"] = num_shown
-        elif 'lookup' in request.form:
+        if 'lookup' in request.form:
             member_lookup = db_memberLookUp(request.form.get('member_search', '').strip())
             if not member_lookup:
                 flash("Member not found :(")
@@ -312,20 +512,62 @@ def owner_memberships():
         else:
             return redirect(request.referrer)
 
-    # Fetch Member List
-    member_list = db_showAllMembers()
+    # Fetch one page of the member directory (?page=&sort=&order=&q=)
+    directory = directoryArgs()
+    member_list, has_next = db_showAllMembers(
+        directory["page"], MEMBERS_PER_PAGE,
+        directory["sort"], directory["order"], directory["q"])
 
-    # Fetch recent check-ins
-    recent_checkins = db_showRecentCheckIns(num_shown)
+    # Fetch recent check-ins ("Load More" pages through recent_checkins_page)
+    recent_checkins = db_showRecentCheckIns(CHECKIN_FIRST_PAGE)
     
     return render_template(
         "/gymman_templates/owner_view/memberships.html", 
         username=session["username"], 
         name=session["name"],
         recent_checkins=recent_checkins,
-        num_shown=num_shown,
+        next_cursor=checkinCursor(recent_checkins, CHECKIN_FIRST_PAGE),
         member_lookup=member_lookup,
-        member_list=member_list
+        member_list=member_list,
+        directory=directory,
+        has_next=has_next
+    )
+
+# the whole member directory in one page, rendered row by row as MySQL
+# streams it instead of building the full list in memory first (owner)
+@auth.route("/owner/memberships/directory")
+def owner_member_directory():
+    if not is_logged_in("Owner"):
+        return redirect(url_for("auth.login"))
+    directory = directoryArgs()
+    members = db_streamAllMembers(directory["sort"], directory["order"], directory["q"])
+    return stream_template(
+        "/gymman_templates/owner_view/member_directory.html",
+        username=session["username"],
+        name=session["name"],
+        members=members,
+        directory=directory
+    )
+
+# hour-of-week heatmap, peak hours and visit frequency from the in-memory
+# check-in columns (?days=N, 0 = all time)
+OCCUPANCY_RANGES = (7, 30, 90, 365, 0)
+
+@auth.route("/owner/checkins/analytics")
+def owner_checkin_analytics():
+    if not is_logged_in("Owner"):
+        return redirect(url_for("auth.login"))
+    days = request.args.get("days", 90, type=int)
+    if days not in OCCUPANCY_RANGES:
+        days = 90
+    return render_template(
+        "/gymman_templates/owner_view/checkin_analytics.html",
+        username=session["username"],
+        name=session["name"],
+        occupancy=db_checkinOccupancy(days=days or None),
+        days=days,
+        ranges=OCCUPANCY_RANGES,
+        weekdays=("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
     )
 
 @auth.route("/owner/payments", methods=['GET', 'POST'])
@@ -337,55 +579,10 @@ def owner_payments():
     search_results = None
     aggregate_total = None
 
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-    pending_payments = db_loadPendingPayments()
-
     if request.method == 'POST':
         # Search payments by member and/or date range and status
         if 'search_payment' in request.form:
-            member_query = request.form.get("search_member", "").strip()
-            date_from = request.form.get("date_from")  # yyyy-mm-dd
-            date_to = request.form.get("date_to")      # yyyy-mm-dd
-            status_filter = request.form.get("status_filter", "").strip().lower()
-
-            where = []
-            params = []
-
-            if member_query:
-                where.append("(p.member_id = %s OR CONCAT(m.first_name, ' ', m.last_name) LIKE %s)")
-                params.append(member_query)
-                params.append(f"%{member_query}%")
-
-            if date_from:
-                where.append("p.payment_date >= %s")
-                params.append(date_from)
-            if date_to:
-                where.append("p.payment_date <= %s")
-                params.append(date_to)
-
-            if status_filter in ("pending", "complete", "failed", "paid"):
-                where.append("LOWER(p.status) = %s")
-                params.append(status_filter)
-
-            sql = """
-                SELECT 
-                    p.payment_id,
-                    p.member_id,
-                    CONCAT(m.first_name, ' ', m.last_name) AS member_name,
-                    p.amount,
-                    p.payment_date,
-                    p.status,
-                    p.type
-                FROM Payments AS p
-                JOIN Members AS m ON p.member_id = m.member_id
-            """
-            if where:
-                sql += " WHERE " + " AND ".join(where)
-            sql += " ORDER BY p.payment_date DESC"
-
-            cursor.execute(sql, tuple(params))
-            search_results = cursor.fetchall()
+            search_results = db_searchPayments(**paymentFilters(request.form))
 
         # Aggregate complete payments for last N days
         elif 'aggregate_over_n' in request.form:
@@ -394,21 +591,22 @@ def owner_payments():
                 n_days = int(n_days_raw)
             except (TypeError, ValueError):
                 flash("Invalid number of days.")
-                cursor.close()
-                db.close()
                 return redirect(request.referrer)
 
-            cursor.execute("""
-                SELECT SUM(amount) AS total
-                FROM Payments
-                WHERE LOWER(status) = 'complete'
-                  AND payment_date >= (CURDATE() - INTERVAL %s DAY)
-            """, (n_days,))
-            row = cursor.fetchone()
-            aggregate_total = row["total"] or 0.0
+            today = datetime.now().date()
+            aggregate_total = db_revenueBetween(today - timedelta(days=n_days), today)
 
-    cursor.close()
-    db.close()
+        # Mark a pending payment complete / failed
+        elif 'update_payment_status' in request.form:
+            payment_id = request.form.get("payment_id")
+            status = request.form.get("new_status")
+            if not payment_id or not db_updatePaymentStatus(payment_id, status):
+                flash("Could not update that payment.")
+            else:
+                flash(f"Payment {payment_id} marked {normalizePaymentStatus(status)}.")
+            return redirect(request.referrer or url_for("auth.owner_payments"))
+
+    pending_payments = db_loadPendingPayments()
 
     return render_template(
         "/gymman_templates/owner_view/payments.html", 
@@ -416,7 +614,64 @@ def owner_payments():
         name=session["name"],
         pending_payments=pending_payments,
         search_results=search_results,
-        aggregate_total=aggregate_total
+        aggregate_total=aggregate_total,
+        series_from={
+            "week": (datetime.now().date() - timedelta(weeks=52)).isoformat(),
+            "month": (datetime.now().date() - timedelta(days=3 * 365)).isoformat(),
+        }
+    )
+
+# revenue per day / week / month as JSON, for charts
+# (?bucket=day|week|month&from=yyyy-mm-dd&to=yyyy-mm-dd&status=&type=)
+@auth.route("/owner/revenue/series")
+def owner_revenue_series():
+    if not is_logged_in("Owner"):
+        return jsonify({"error": "owner login required"}), 401
+
+    bucket = request.args.get("bucket", "day")
+    if bucket not in REVENUE_BUCKETS:
+        return jsonify({"error": f"bucket must be one of {', '.join(REVENUE_BUCKETS)}"}), 400
+    status = normalizePaymentStatus(request.args.get("status")) or "complete"
+    try:
+        date_to = datetime.strptime(request.args["to"], "%Y-%m-%d").date() \
+            if request.args.get("to") else datetime.now().date()
+        date_from = datetime.strptime(request.args["from"], "%Y-%m-%d").date() \
+            if request.args.get("from") else date_to - timedelta(days=29)
+    except ValueError:
+        return jsonify({"error": "dates must be yyyy-mm-dd"}), 400
+    if date_from > date_to:
+        return jsonify({"error": "from is after to"}), 400
+
+    series = db_revenueSeries(date_from, date_to, bucket, status,
+                              request.args.get("type") or None)
+    return jsonify({
+        "bucket": bucket,
+        "status": status,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "total": round(sum(p["total"] for p in series), 2),
+        "series": series,
+    })
+
+# stream the payments matching the search form's filters as CSV or NDJSON,
+# straight off a server-side cursor so years of rows never sit in memory
+@auth.route("/owner/payments/export")
+def owner_payments_export():
+    if not is_logged_in("Owner"):
+        return redirect(url_for("auth.login"))
+
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        flash("Unknown export format.")
+        return redirect(url_for("auth.owner_payments"))
+
+    batches = db_streamPayments(**paymentFilters(request.args))
+    mimetype, encode = EXPORT_FORMATS[export_format]
+    filename = f"payments-{datetime.now():%Y%m%d-%H%M%S}.{export_format}"
+    return Response(
+        stream_with_context(encode(batches, PAYMENT_COLUMNS)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 @auth.route("/owner/staff", methods=['GET', 'POST'])
@@ -465,15 +720,29 @@ def owner_staff():
             shift_managed=shift_managed
         )
         flash(f"Staff member registered with ID {staff_id}.")
+        linkAccount(request.form.get("username"), staff_id)
+        return redirect(request.referrer)
+
+    # Link an existing staff / trainer login to a Staff row
+    if request.method == 'POST' and 'link_account' in request.form:
+        username = request.form.get("username")
+        staff_id = request.form.get("staff_id")
+        if not username or not staff_id:
+            flash("Username and staff member are required to link an account.")
+            return redirect(request.referrer)
+        linkAccount(username, staff_id)
         return redirect(request.referrer)
 
     # Show staff listing
     db = get_db()
     cursor = db.cursor(dictionary=True)
     cursor.execute("""
-        SELECT staff_id, first_name, last_name, employment_date, birth_date, staff_address
-        FROM Staff
-        ORDER BY last_name, first_name
+        SELECT s.staff_id, s.first_name, s.last_name, s.employment_date, s.birth_date,
+               s.staff_address, GROUP_CONCAT(u.username ORDER BY u.username) AS usernames
+        FROM Staff AS s
+        LEFT JOIN users AS u ON u.staff_id = s.staff_id
+        GROUP BY s.staff_id
+        ORDER BY s.last_name, s.first_name
     """)
     staff_list = cursor.fetchall()
     cursor.close()
@@ -491,10 +760,6 @@ def owner_trainers():
     if not is_logged_in("Owner"):
         return redirect(url_for("auth.login"))
 
-    # Load all trainer-client relationships
-    trainer_clients = db_showTrainerClientRel()
-    search_term = None
-
     if request.method == 'POST':
         # Register a trainer from existing staff
         if 'register_trainer' in request.form:
@@ -513,6 +778,7 @@ def owner_trainers():
 
             db_registerTrainer(staff_id, speciality, active=active)
             flash("Trainer registered.")
+            linkAccount(request.form.get("username"), staff_id)
             return redirect(request.referrer)
 
         # Assign trainer to a member
@@ -529,17 +795,9 @@ def owner_trainers():
             flash("Trainer assigned to member.")
             return redirect(request.referrer)
 
-        # Filter trainer-client relationships
-        elif 'search_relationships' in request.form:
-            search_term = request.form.get("search_term", "").strip().lower()
-            if search_term:
-                filtered = []
-                for rel in trainer_clients:
-                    trainer_name = (rel.get("trainer") or "").lower()
-                    client_name = (rel.get("client") or "").lower()
-                    if search_term in trainer_name or search_term in client_name:
-                        filtered.append(rel)
-                trainer_clients = filtered
+    # one filtered page of trainer-client relationships (GET filters)
+    relationships = relationshipArgs()
+    trainer_clients, has_next = db_showTrainerClientRel(**relationships)
 
     # Also provide list of trainers and members for dropdowns
     db = get_db()
@@ -572,7 +830,8 @@ def owner_trainers():
         all_trainers=all_trainers,
         all_members=all_members,
         all_staff=all_staff,
-        search_term=search_term
+        relationships=relationships,
+        has_next=has_next
     )
 
 @auth.route("/owner/exercise_logs", methods=['GET', 'POST'])
@@ -673,11 +932,32 @@ def owner_exercise_logs(): # TODO: actually add the strenght / cardio tables
         exercises=exercises
     )
 
+# in-process SQL stats for this worker: per route, per db_* function and
+# the slow query log. a POST clears them first (owner)
+@auth.route("/owner/sql-stats", methods=['GET', 'POST'])
+def owner_sql_stats():
+    if not is_logged_in("Owner"):
+        return jsonify(error="not logged in"), 403
+    if request.method == 'POST':
+        instrument.stats.reset()
+    return jsonify(
+        enabled=instrument.ENABLED,
+        slow_query_ms=instrument.SLOW_QUERY_MS,
+        routes=instrument.stats.route_summary(),
+        functions=instrument.stats.function_summary(),
+        slow_queries=instrument.stats.slow_queries(),
+        pool=get_pool().stats(),
+    )
+
 @auth.route("/owner/error_logs")
 def owner_errors():
     if not is_logged_in("Owner"):
         return redirect(url_for("auth.login"))
-    return render_template("/gymman_templates/owner_view/error_logs.html", username=session["username"], name=session["name"])
+    return render_template(
+        "/gymman_templates/owner_view/error_logs.html",
+        username=session["username"],
+        name=session["name"],
+        **errorLogPage())
 
 # +++++++++++++++++++++++++++++++++++
 # =========== Staff Views ===========
@@ -698,26 +978,19 @@ def staff_checkins():
     if not is_logged_in("Staff"):
         return redirect(url_for("auth.login"))
     
-    num_shown = session.get("num_checkins_shown", 15)
-
     if request.method == 'POST':
-        # If "Load More" is pressed, increment by 5
-        if 'load_more' in request.form:
-            num_shown += 5
-            session["num_checkins_shown"] = num_shown
-        else:
-            # If this POST was for a check-in action
-            return checkin()
+        # If this POST was for a check-in action
+        return checkin()
 
-    # Fetch recent check-ins
-    recent_checkins = db_showRecentCheckIns(num_shown)
+    # Fetch recent check-ins ("Load More" pages through recent_checkins_page)
+    recent_checkins = db_showRecentCheckIns(CHECKIN_FIRST_PAGE)
 
     return render_template(
         "/gymman_templates/staff_view/checkins.html",
         username=session["username"],
         name=session["name"],
         recent_checkins=recent_checkins,
-        num_shown=num_shown)
+        next_cursor=checkinCursor(recent_checkins, CHECKIN_FIRST_PAGE))
 
 @auth.route("/staff/payments")
 def staff_payments():
@@ -735,7 +1008,11 @@ def staff_memberships():
 def staff_error_logs():
     if not is_logged_in("Staff"):
         return redirect(url_for("auth.login"))
-    return render_template("/gymman_templates/staff_view/error_logs.html", username=session["username"], name=session["name"])
+    return render_template(
+        "/gymman_templates/staff_view/error_logs.html",
+        username=session["username"],
+        name=session["name"],
+        **errorLogPage())
 
 # +++++++++++++++++++++++++++++++++++++
 # =========== Trainer Views ===========
@@ -750,25 +1027,17 @@ def trainer_dashboard():
 def trainer_clients():
     if not is_logged_in("Trainer"):
         return redirect(url_for("auth.login"))
-    name = session['name'].lower()
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT tc.trainer_id FROM TrainerClients AS tc 
-        JOIN Staff AS s ON tc.trainer_id = s.staff_id 
-        WHERE CONCAT(s.first_name, ' ', s.last_name) LIKE %s
-    """, (f"%{name}%",))
-    row = cursor.fetchone()
-    trainer_id = row["trainer_id"] if row else None
+    trainer_id = session.get("staff_id")
+    if trainer_id is None:
+        flash("Your account isn't linked to a trainer profile yet, ask the owner to link it.")
     trainer_clients = db_showTrainerClients(trainer_id)
-    
-    cursor.close()
-    db.close()
+    rollups = db_getExerciseRollups(c["member_id"] for c in trainer_clients)
     return render_template(
         "/gymman_templates/trainer_view/clients.html", 
         username=session["username"], 
-        name=name, 
-        trainer_clients=trainer_clients)
+        name=session["name"], 
+        trainer_clients=trainer_clients,
+        rollups=rollups)
 
 @auth.route("/trainer/workouts")
 def trainer_workouts():
@@ -786,7 +1055,19 @@ def trainer_logs():
 def trainer_reports():
     if not is_logged_in("Trainer"):
         return redirect(url_for("auth.login"))
-    return render_template("/gymman_templates/trainer_view/reports.html", username=session["username"], name=session["name"])
+    trainer_id = session.get("staff_id")
+    if trainer_id is None:
+        flash("Your account isn't linked to a trainer profile yet, ask the owner to link it.")
+    # current clients only, and all of their histories in one query
+    clients = [c for c in db_showTrainerClients(trainer_id) if not c["client_end_date"]]
+    reports = analytics.progress_reports(c["member_id"] for c in clients)
+    return render_template(
+        "/gymman_templates/trainer_view/reports.html", 
+        username=session["username"], 
+        name=session["name"],
+        clients=clients,
+        reports=reports,
+        rpe_window=analytics.RPE_WINDOW)
 
 # ++++++++++++++++++++++++++++++++++++
 # =========== Member Views ===========
@@ -0,0 +1,219 @@
+# ======================================================================= #
+#                        GYMMAN: MODEL BENCHMARKS                         #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (bench.py) times every db_* function in models.py at a few    #
+# data sizes and writes the numbers to JSON, so every performance change  #
+# has a before and an after. Point db.env at a SCRATCH database:          #
+#                                                                         #
+#   1. for each --sizes entry (members, ascending) seed.py tops the DB    #
+#      up to that many members                                            #
+#   2. the in-memory indexes (member search, revenue, check-in columns)   #
+#      are rebuilt and their build time recorded as index:<name>          #
+#   3. every probe in explain.PROBES runs --repeat times. Writes execute  #
+#      for real but commit() is a no-op, so the pool's rollback on        #
+#      release throws them away. The TTL caches are cleared before each   #
+#      call so we time the query, not the cache                           #
+#                                                                         #
+# Each function gets calls, mean / min / p50 / p95 ms and the number of   #
+# statements per call. --compare prints the p50 ratio against an older    #
+# results file (> 1.00 is slower now).                                    #
+#                                                                         #
+# Usage (run the migrations first):                                       #
+#   python -m website.bench --sizes 1000,10000 [--repeat 20]              #
+#          [--out bench.json] [--compare old.json] [--only db_findMember] #
+# ======================================================================= #
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from . import models, seed
+from .explain import PROBES, first_of, sample_ids
+from .instrument import _percentile
+
+
+class _BenchCursor:
+    def __init__(self, counter, cursor):
+        self._counter = counter
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args, **kwargs):
+        self._counter[0] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counter[0] += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+
+class _BenchConnection:
+    """get_db() connection that counts statements and never commits."""
+
+    def __init__(self, counter, conn):
+        self._counter = counter
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _BenchCursor(self._counter, self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+def _members():
+    db = models.get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Members")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    db.close()
+    return count
+
+def _summary(times, statements):
+    times = sorted(times)
+    return {
+        "calls": len(times),
+        "mean_ms": round(sum(times) / len(times), 3),
+        "min_ms": round(times[0], 3),
+        "p50_ms": round(_percentile(times, 50), 3),
+        "p95_ms": round(_percentile(times, 95), 3),
+        "statements": statements,
+    }
+
+def _clear_caches():
+    models.dashboard_cache.clear()
+    models.roster_cache.clear()
+
+def _build_indexes():
+    results = {}
+    for name, build in (("member_index", models.member_index.build),
+                        ("revenue_index", lambda: (models.revenue_index.invalidate(),
+                                                   models.revenue_index.total())),
+                        # first size loads everything, later ones only the new rows
+                        ("checkin_columns", lambda: (models.checkin_columns.invalidate(),
+                                                     models.checkin_columns.heatmap()))):
+        started = time.perf_counter()
+        build()
+        results[f"index:{name}"] = _summary([(time.perf_counter() - started) * 1000], None)
+    return results
+
+def run(repeat=20, only=None):
+    """{db_* name: summary} against whatever the database holds right now."""
+    results = _build_indexes()
+    sample = sample_ids()
+    # queued check-ins would be written outside our rolled back connections
+    models.checkin_buffer.enabled = False
+
+    real_get_db = models.get_db
+    try:
+        for name, probe in PROBES.items():
+            if only and name not in only:
+                continue
+            counter = [0]
+            models.get_db = lambda: _BenchConnection(counter, real_get_db())
+            times = []
+            try:
+                for _ in range(repeat):
+                    _clear_caches()
+                    started = time.perf_counter()
+                    first_of(probe(models, sample))
+                    times.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+                continue
+            finally:
+                models.get_db = real_get_db
+            results[name] = _summary(times, round(counter[0] / repeat, 1))
+    finally:
+        models.get_db = real_get_db
+        _clear_caches()
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, previous):
+    """[(size, name, old p50, new p50, ratio)] for every function in both runs."""
+    rows = []
+    for size, results in current["results"].items():
+        old = previous.get("results", {}).get(size, {})
+        for name, summary in results.items():
+            before = old.get(name, {}).get("p50_ms")
+            now = summary.get("p50_ms")
+            if before and now is not None:
+                rows.append((size, name, before, now, now / before))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every db_* model at several data sizes.")
+    parser.add_argument("--sizes", default="1000",
+                        help="comma separated member counts to seed up to (default 1000)")
+    parser.add_argument("--repeat", type=int, default=20, help="calls per function (default 20)")
+    parser.add_argument("--out", default=f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument("--compare", help="older results file to compare against")
+    parser.add_argument("--only", help="comma separated db_* names to run")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for seed.py")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    only = set(args.only.split(",")) if args.only else None
+    output = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for size in sizes:
+        have = _members()
+        if have < size:
+            print(f"seeding {size - have} members...", file=sys.stderr)
+            seed.seed(size - have, rng_seed=args.seed)
+        elif have > size:
+            print(f"warning: database already has {have} members, reporting as {size}",
+                  file=sys.stderr)
+        print(f"benchmarking at {size} members...", file=sys.stderr)
+        output["results"][str(size)] = run(args.repeat, only)
+
+    with open(args.out, "w") as f:
+        json.dump(output, f, indent=2)
+
+    for size, results in output["results"].items():
+        print(f"\n{size} members")
+        for name, summary in results.items():
+            if "error" in summary:
+                print(f"  {name:34} ERROR {summary['error']}")
+            else:
+                print(f"  {name:34} p50 {summary['p50_ms']:9.2f}ms  p95 {summary['p95_ms']:9.2f}ms"
+                      f"  {summary['statements'] if summary['statements'] is not None else '-':>5} stmts")
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\nvs {args.compare} ({previous.get('commit')}), p50 ratio")
+        for size, name, before, now, ratio in compare(output, previous):
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            print(f"  {size:>8} {name:34} {before:9.2f} -> {now:9.2f}ms  {ratio:5.2f}x{flag}")
+    print(f"\nwrote {args.out}")
+    return 1 if any("error" in s for r in output["results"].values() for s in r.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# ======================================================================= #
+#                          GYMMAN: TTL CACHE                              #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (cache.py) is a tiny in-process cache for query results that  #
+# are read far more often than they change. Entries expire after a TTL,   #
+# and the model functions that change the underlying rows invalidate the  #
+# affected keys explicitly so pages never show stale numbers for long.    #
+#                                                                         #
+# NOTE: each gunicorn worker has its own cache, the TTL bounds how stale  #
+# a worker that didn't see the write can get.                             #
+# ======================================================================= #
+
+import threading
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._data = {}     # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    # return the cached value for key, or compute it with loader() and cache it
+    def get_or_load(self, key, loader, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
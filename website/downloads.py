@@ -0,0 +1,57 @@
+# ======================================================================= #
+#                              DOWNLOADS                                  #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (downloads.py) serves the PDFs in static/documents at         #
+# /downloads/<file> without tying a gunicorn worker up pushing bytes.     #
+#                                                                         #
+# With DOWNLOAD_ACCEL_PREFIX set (db.env / environment) the route only    #
+# checks the file exists and answers with an empty body and               #
+#   X-Accel-Redirect: <prefix><file>                                      #
+# so Nginx sends it itself (sendfile, Range, If-Modified-Since). Nginx:   #
+#   location /_downloads/ {                                               #
+#       internal;                                                         #
+#       alias /home/isaac/local_isaacstephens/isaacstephens.com/          #
+#             website/static/documents/;                                  #
+#   }                                                                     #
+# and DOWNLOAD_ACCEL_PREFIX=/_downloads/                                  #
+#                                                                         #
+# Without it (dev, no Nginx) Flask sends the file: ETag + Last-Modified,  #
+# If-None-Match / If-Modified-Since -> 304, Range -> 206 (resumes, PDF    #
+# viewers fetching pages), through the server's wsgi.file_wrapper.        #
+# ======================================================================= #
+
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import Blueprint, abort, current_app, send_from_directory
+from werkzeug.security import safe_join
+
+DOWNLOAD_DIR = os.path.join(os.path.dirname(__file__), "static", "documents")
+ACCEL_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX", "")
+MAX_AGE = int(os.getenv("DOWNLOAD_MAX_AGE", 86400))     # names aren't hashed, keep it short
+
+downloads = Blueprint('downloads', __name__)
+
+
+# Nginx keeps these headers from us and adds length / ranges / validators
+# from the file itself
+def _accel(filename):
+    response = current_app.response_class(
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+    response.headers["X-Accel-Redirect"] = ACCEL_PREFIX + quote(filename)
+    response.headers["Content-Disposition"] = \
+        f"attachment; filename*=UTF-8''{quote(os.path.basename(filename))}"
+    response.headers["Cache-Control"] = f"public, max-age={MAX_AGE}"
+    return response
+
+@downloads.route('/downloads/<path:filename>')
+def download(filename):
+    path = safe_join(DOWNLOAD_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    if ACCEL_PREFIX:
+        return _accel(filename)
+    return send_from_directory(DOWNLOAD_DIR, filename, as_attachment=True,
+                               conditional=True, etag=True, max_age=MAX_AGE)
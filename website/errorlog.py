@@ -0,0 +1,124 @@
+# ======================================================================= #
+#                          GYMMAN: ERROR LOGGING                          #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (errorlog.py) captures errors for the Error Logs pages:       #
+#                                                                         #
+#   - unhandled exceptions in any request (got_request_exception)         #
+#   - WARNING+ records logged by the website.* loggers (pool leaks,       #
+#     failed index rebuilds, ...)                                         #
+#                                                                         #
+# Each one becomes a structured record in an in-memory ring buffer and is #
+# handed to error_buffer (models.py), which batch-writes them to the      #
+# ErrorLogs table from a background thread. Capturing never blocks and    #
+# never writes to the DB inside the request: if the buffer is full the    #
+# record is only kept in the ring buffer and counted as dropped.          #
+# ======================================================================= #
+
+import logging
+import os
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+
+from flask import got_request_exception, has_request_context, request, session
+
+from .models import error_buffer
+
+RING_SIZE = int(os.getenv("ERROR_RING_SIZE", 500))
+
+recent = deque(maxlen=RING_SIZE)
+_dropped = 0
+_lock = threading.Lock()
+
+# loggers whose records are never captured, so a failing ErrorLogs write
+# can't feed itself new errors to write
+_IGNORED_LOGGERS = ("website.writebehind", __name__)
+
+
+def _record(level, message, exc_info=None, logger=None):
+    exc_type, exc, tb = exc_info or (None, None, None)
+    record = {
+        "error_id": None,
+        "logged_at": datetime.now(),
+        "level": level,
+        "logger": logger,
+        "route": None,
+        "path": None,
+        "method": None,
+        "username": None,
+        "exception_type": exc_type.__name__ if exc_type else None,
+        "message": (message or (str(exc) if exc else ""))[:2000],
+        "traceback": "".join(traceback.format_exception(exc_type, exc, tb)) if exc_type else None,
+    }
+    if has_request_context():
+        record["route"] = request.endpoint
+        record["path"] = request.path[:512]
+        record["method"] = request.method
+        record["username"] = session.get("username")
+    return record
+
+def capture(record):
+    global _dropped
+    recent.append(record)
+    if not error_buffer.put(record):
+        with _lock:
+            _dropped += 1
+
+def dropped():
+    return _dropped
+
+def _on_request_exception(sender, exception, **extra):
+    # flask logs the same exception right after this signal, skip that copy
+    try:
+        exception._gymman_captured = True
+    except AttributeError:
+        pass
+    capture(_record(
+        "ERROR", str(exception),
+        (type(exception), exception, exception.__traceback__),
+    ))
+
+
+class BufferedErrorHandler(logging.Handler):
+    def emit(self, record):
+        if record.name.startswith(_IGNORED_LOGGERS):
+            return
+        if record.exc_info and getattr(record.exc_info[1], "_gymman_captured", False):
+            return
+        try:
+            capture(_record(
+                record.levelname, record.getMessage(),
+                record.exc_info, logger=record.name,
+            ))
+        except Exception:
+            self.handleError(record)
+
+def _matches(r, since, until, route, exception_type):
+    return not (
+        (since and r["logged_at"] < since)
+        or (until and r["logged_at"] > until)
+        or (route and r["route"] != route)
+        or (exception_type and r["exception_type"] != exception_type)
+    )
+
+# unflushed records matching the filters, newest first (for page 1 of the
+# error log views, before the background writer has caught up)
+def pending(since=None, until=None, route=None, exception_type=None):
+    return [r for r in reversed(error_buffer.snapshot())
+            if _matches(r, since, until, route, exception_type)]
+
+# the in-memory ring, newest first (what the views fall back to when the
+# database itself is the thing that's failing)
+def recent_errors(since=None, until=None, route=None, exception_type=None):
+    return [r for r in reversed(recent)
+            if _matches(r, since, until, route, exception_type)]
+
+def init_app(app):
+    got_request_exception.connect(_on_request_exception, app)
+    logger = logging.getLogger("website")
+    if not any(isinstance(h, BufferedErrorHandler) for h in logger.handlers):
+        logger.addHandler(BufferedErrorHandler(level=logging.WARNING))
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
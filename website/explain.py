@@ -0,0 +1,337 @@
+# ======================================================================= #
+#                        GYMMAN: QUERY PLAN CHECK                         #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (explain.py) makes sure no db_* model regresses to a full     #
+# table scan. Run it against a local database seeded with realistic row   #
+# counts (the optimizer happily scans tiny tables):                       #
+#                                                                         #
+#   1. every db_* function in models.py is called once with ids/names     #
+#      picked from the database. SELECTs run for real so the function     #
+#      gets its data; writes are only recorded, never executed, and each  #
+#      connection is rolled back when it's handed back to the pool        #
+#   2. every recorded statement is run again under EXPLAIN with the same  #
+#      parameters                                                         #
+#   3. any plan step with access type ALL on a table holding at least     #
+#      --min-rows rows fails the run, unless ALLOWED_SCANS says why it    #
+#      has to read everything                                             #
+#                                                                         #
+# A db_* function with no entry in PROBES fails the run too, so a new     #
+# model can't skip the check.                                             #
+#                                                                         #
+# Usage (uses the same db.env as the app, run the migrations first):      #
+#   python -m website.explain [--min-rows 1000] [--verbose]               #
+# or as part of pytest (tests/test_explain.py) with EXPLAIN_SEEDED_DB=1   #
+# ======================================================================= #
+
+import argparse
+import inspect
+import sys
+import types
+from datetime import date, timedelta
+
+from . import models
+from .pool import get_pool
+
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# (db_* function, table as named/aliased in the query) -> why a full scan
+# there is expected
+ALLOWED_SCANS = {
+    ("db_streamAllMembers", "m"): "the full directory export reads every member",
+}
+
+
+class _RecordingCursor:
+    """Runs SELECTs, only records writes."""
+
+    def __init__(self, recorder, cursor):
+        self._recorder = recorder
+        self._cursor = cursor
+        self._skipped = False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter([]) if self._skipped else iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._recorder.append((operation, params))
+        self._skipped = operation.lstrip().upper().startswith(_WRITES)
+        if not self._skipped:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        if seq_params:
+            self.execute(operation, seq_params[0])
+
+    def fetchone(self):
+        return None if self._skipped else self._cursor.fetchone()
+
+    def fetchall(self):
+        return [] if self._skipped else self._cursor.fetchall()
+
+    def fetchmany(self, *args, **kwargs):
+        return [] if self._skipped else self._cursor.fetchmany(*args, **kwargs)
+
+    @property
+    def rowcount(self):
+        return 0 if self._skipped else self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return 0 if self._skipped else self._cursor.lastrowid
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except Exception:
+            pass    # unread rows from a stream we stopped early
+
+
+class _RecordingConnection:
+    """Pooled connection whose commit() does nothing (release rolls back)."""
+
+    def __init__(self, recorder):
+        self._recorder = recorder
+        self._conn = get_pool().checkout()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._recorder, self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+# ids / names to call the probes with, the lowest of each (shared with bench.py)
+def sample_ids():
+    db = get_pool().checkout()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT
+            (SELECT MIN(member_id) FROM Members) AS member_id,
+            (SELECT MIN(staff_id) FROM Staff) AS staff_id,
+            (SELECT MIN(trainer_id) FROM TrainerClients) AS trainer_id,
+            (SELECT MIN(payment_id) FROM Payments) AS payment_id,
+            (SELECT MIN(exercise_id) FROM Exercises) AS exercise_id,
+            (SELECT MIN(phone_number_id) FROM PhoneNumbers) AS phone_number_id,
+            (SELECT MIN(emergency_contact_id) FROM EmergencyContacts) AS ec_id
+    """)
+    sample = cursor.fetchone()
+    cursor.execute("""
+        SELECT first_name, last_name, email FROM Members WHERE member_id = %s
+    """, (sample["member_id"],))
+    sample.update(cursor.fetchone() or {})
+    cursor.close()
+    db.close()
+    return sample
+
+# db_* name -> call(models, sample). keep one entry per model in models.py
+_TODAY = date.today()
+_YEAR_AGO = _TODAY - timedelta(days=365)
+PROBES = {
+    "db_findMember": lambda m, s: m.db_findMember(s["last_name"]),
+    "db_logCheckin": lambda m, s: m.db_logCheckin(s),
+    "db_findMembersByIds": lambda m, s: m.db_findMembersByIds([s["member_id"]]),
+    "db_checkinOccupancy": lambda m, s: m.db_checkinOccupancy(days=30),
+    "db_logCheckins": lambda m, s: m.db_logCheckins([s["member_id"]]),
+    "db_getNumTotalMembers": lambda m, s: m.db_getNumTotalMembers(),
+    "db_getNumPendingPayments": lambda m, s: m.db_getNumPendingPayments(),
+    "db_getNumActiveTrainers": lambda m, s: m.db_getNumActiveTrainers(),
+    "db_getDashboardCounts": lambda m, s: m.db_getDashboardCounts(),
+    "db_showRecentCheckIns": lambda m, s: m.db_showRecentCheckIns(15, before_id=1000000),
+    "db_memberLookUp": lambda m, s: m.db_memberLookUp(s["last_name"]),
+    "db_showAllMembers": lambda m, s: [m.db_showAllMembers(sort=sort, search=q)
+                                       for sort in m.MEMBER_SORTS
+                                       for q in (None, s["last_name"][:3])],
+    "db_streamAllMembers": lambda m, s: m.db_streamAllMembers(),
+    "db_showTrainerClientRel": lambda m, s: [
+        m.db_showTrainerClientRel(),
+        m.db_showTrainerClientRel(trainer_id=s["trainer_id"], status="active"),
+        m.db_showTrainerClientRel(client=s["last_name"][:3], date_from=_YEAR_AGO),
+    ],
+    "db_showTrainerClients": lambda m, s: m.db_showTrainerClients(s["trainer_id"]),
+    "db_getUserStaffId": lambda m, s: m.db_getUserStaffId(dict(s, staff_id=None)),
+    "db_linkStaffAccount": lambda m, s: m.db_linkStaffAccount("explain", s["staff_id"]),
+    "db_getMemberPhone": lambda m, s: m.db_getMemberPhone(s["member_id"]),
+    "db_getMemberEmergencyContacts": lambda m, s: m.db_getMemberEmergencyContacts(s["member_id"]),
+    "db_createMemberUser": lambda m, s: m.db_createMemberUser(
+        "Explain", "Probe", "1990-01-01", "explain@example.com", "M", "explain-probe", "explain"),
+    "db_updateMemberEmail": lambda m, s: m.db_updateMemberEmail(s["member_id"], s["email"]),
+    "db_addMemberPhone": lambda m, s: m.db_addMemberPhone(s["member_id"], "5550000000", "mobile"),
+    "db_updateMemberPhone": lambda m, s: m.db_updateMemberPhone(
+        s["member_id"], s["phone_number_id"], "5550000000", "mobile"),
+    "db_deletePhoneNum": lambda m, s: m.db_deletePhoneNum(s["phone_number_id"]),
+    "db_addMemberEmergencyContact": lambda m, s: m.db_addMemberEmergencyContact(
+        s["member_id"], "Explain", "Probe", "friend", "5550000000", "ec@example.com"),
+    "db_updateMemberEmergencyContact": lambda m, s: m.db_updateMemberEmergencyContact(
+        s["member_id"], s["ec_id"], "Explain", "Probe", "friend", "5550000000", "ec@example.com"),
+    "db_deleteEmergencyContact": lambda m, s: m.db_deleteEmergencyContact(s["ec_id"]),
+    "db_deleteMember": lambda m, s: m.db_deleteMember(s["member_id"]),
+    "db_addPayment": lambda m, s: m.db_addPayment(s["member_id"], 10),
+    "db_updatePaymentStatus": lambda m, s: m.db_updatePaymentStatus(s["payment_id"], "failed"),
+    "db_revenueBetween": lambda m, s: m.db_revenueBetween(_YEAR_AGO, _TODAY),
+    "db_revenueSeries": lambda m, s: m.db_revenueSeries(_YEAR_AGO, _TODAY, "month"),
+    "db_registerStaff": lambda m, s: m.db_registerStaff(
+        "000-00-0000", "Explain", "Probe", "2020-01-01", "1990-01-01", "1 Probe St", "hourly",
+        hourly_rate=15),
+    "db_registerTrainer": lambda m, s: m.db_registerTrainer(s["staff_id"], "explain"),
+    "db_getAllTrainers": lambda m, s: m.db_getAllTrainers(),
+    "db_assignTrainer": lambda m, s: m.db_assignTrainer(s["trainer_id"] or s["staff_id"], s["member_id"]),
+    "db_logExercise": lambda m, s: m.db_logExercise(s["member_id"], "explain", 5, _TODAY),
+    "db_modifyExercise": lambda m, s: m.db_modifyExercise(s["exercise_id"], rpe=5, date=_YEAR_AGO),
+    "db_deleteExercise": lambda m, s: m.db_deleteExercise(s["exercise_id"]),
+    "db_getExerciseRollups": lambda m, s: m.db_getExerciseRollups([s["member_id"]]),
+    "db_getExerciseRollup": lambda m, s: m.db_getExerciseRollup(s["member_id"]),
+    "db_getExercise": lambda m, s: m.db_getExercise(s["member_id"]),
+    "db_getExerciseHistory": lambda m, s: m.db_getExerciseHistory([s["member_id"]], since=_YEAR_AGO),
+    "db_aggregatePayments": lambda m, s: [m.db_aggregatePayments(),
+                                          m.db_aggregatePayments(True, s["member_id"])],
+    "db_aggregateRPE": lambda m, s: m.db_aggregateRPE(s["member_id"]),
+    "db_aggregateMaxWeight": lambda m, s: m.db_aggregateMaxWeight(s["member_id"]),
+    "db_searchPayments": lambda m, s: [
+        m.db_searchPayments(member_query=str(s["member_id"])),
+        m.db_searchPayments(member_query=s["last_name"][:3]),
+        m.db_searchPayments(date_from=_TODAY - timedelta(days=7), status="complete"),
+    ],
+    "db_streamPayments": lambda m, s: m.db_streamPayments(member_query=str(s["member_id"])),
+    "db_loadPendingPayments": lambda m, s: m.db_loadPendingPayments(),
+    "db_aggregateAvgRunDist": lambda m, s: m.db_aggregateAvgRunDist(s["member_id"]),
+    "db_getErrorLog": lambda m, s: [m.db_getErrorLog(),
+                                    m.db_getErrorLog(route="auth.login",
+                                                     since=_TODAY - timedelta(days=1))],
+}
+
+# run a probe's result far enough to execute its SQL (shared with bench.py)
+def first_of(result):
+    # generators (db_stream*) only need to get as far as their query
+    if isinstance(result, types.GeneratorType):
+        next(result, None)
+        result.close()
+    elif isinstance(result, list):
+        for item in result:
+            first_of(item)
+
+def record_statements(sample, errors):
+    """{db_* name: [(sql, params)]} for every probe, failures go to errors."""
+    # warm the in-memory indexes first, their loaders read whole tables by design
+    models.member_index.build()
+    models.revenue_index.total()
+    models.checkin_columns.heatmap()
+    models.dashboard_cache.clear()
+    models.roster_cache.clear()
+
+    recorded = {}
+    real_get_db = models.get_db
+    # queued check-ins would be written outside our rolled back connections
+    buffered = models.checkin_buffer.enabled
+    models.checkin_buffer.enabled = False
+    try:
+        for name, probe in PROBES.items():
+            statements = recorded[name] = []
+            models.get_db = lambda: _RecordingConnection(statements)
+            try:
+                first_of(probe(models, sample))
+            except Exception as e:
+                errors.append((name, e))
+            models.get_db = real_get_db
+            models.dashboard_cache.clear()
+            models.roster_cache.clear()
+    finally:
+        models.get_db = real_get_db
+        models.checkin_buffer.enabled = buffered
+    return recorded
+
+def _explainable(sql):
+    head = sql.lstrip().upper()
+    if head.startswith("INSERT"):
+        return "SELECT" in head     # INSERT ... SELECT, plain VALUES has no plan
+    return head.startswith(("SELECT", "UPDATE", "DELETE"))
+
+def _table_rows(cursor):
+    cursor.execute("""
+        SELECT table_name AS name, table_rows AS row_count
+        FROM information_schema.tables
+        WHERE table_schema = DATABASE()
+    """)
+    return {row["name"].lower(): row["row_count"] or 0 for row in cursor.fetchall()}
+
+def explain(recorded, min_rows=1000):
+    """[(db_* name, sql, plan row, allowed reason or None)] for every full scan."""
+    db = get_pool().checkout()
+    cursor = db.cursor(dictionary=True)
+    sizes = _table_rows(cursor)
+    scans = []
+    try:
+        for name, statements in recorded.items():
+            for sql, params in statements:
+                if not _explainable(sql):
+                    continue
+                cursor.execute("EXPLAIN " + sql, params)
+                for step in cursor.fetchall():
+                    table = step.get("table") or ""
+                    if step.get("type") != "ALL" or table.startswith("<"):
+                        continue
+                    # plans name tables by alias, fall back to the estimate
+                    if sizes.get(table.lower(), step.get("rows") or 0) < min_rows \
+                            and (step.get("rows") or 0) < min_rows:
+                        continue
+                    scans.append((name, sql, step, ALLOWED_SCANS.get((name, table))))
+    finally:
+        cursor.close()
+        db.close()
+    return scans
+
+def unprobed():
+    defined = {name for name, obj in vars(models).items()
+               if name.startswith("db_") and inspect.isfunction(obj)}
+    return sorted(defined - PROBES.keys()), sorted(PROBES.keys() - defined)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN every db_* query, fail on full scans.")
+    parser.add_argument("--min-rows", type=int, default=1000,
+                        help="tables smaller than this may be scanned (default 1000)")
+    parser.add_argument("--verbose", action="store_true", help="print every statement checked")
+    args = parser.parse_args(argv)
+
+    failed = False
+    missing, stale = unprobed()
+    for name in missing:
+        print(f"MISSING PROBE  {name}: add it to PROBES in explain.py")
+        failed = True
+    for name in stale:
+        print(f"STALE PROBE    {name}: no such model anymore")
+        failed = True
+
+    errors = []
+    recorded = record_statements(sample_ids(), errors)
+    for name, e in errors:
+        print(f"PROBE ERROR    {name}: {type(e).__name__}: {e}")
+        failed = True
+    if args.verbose:
+        for name, statements in recorded.items():
+            print(f"{name}: {len(statements)} statement(s)")
+            for sql, _ in statements:
+                print("    " + " ".join(sql.split())[:150])
+
+    for name, sql, step, allowed in explain(recorded, args.min_rows):
+        label = "allowed scan " if allowed else "FULL SCAN    "
+        print(f"{label} {name}: table {step['table']} (~{step.get('rows')} rows)"
+              + (f" -- {allowed}" if allowed else ""))
+        print("    " + " ".join(sql.split())[:200])
+        failed = failed or not allowed
+
+    checked = sum(len(s) for s in recorded.values())
+    print(f"{'FAILED' if failed else 'ok'}: {len(recorded)} models, {checked} statements checked.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
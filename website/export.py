@@ -0,0 +1,57 @@
+# ======================================================================= #
+#                          GYMMAN: DATA EXPORTS                           #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (export.py) turns batches of query rows (lists of dicts, as   #
+# yielded by the db_stream* models) into CSV / NDJSON text chunks. One    #
+# chunk goes out per batch so a response can be streamed with constant    #
+# memory no matter how many rows the query matches.                       #
+# Pass the column names when they're known: the CSV header then goes      #
+# out first, even for an export that matches no rows.                     #
+# ======================================================================= #
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def csv_stream(batches, fieldnames=None):
+    buffer = io.StringIO()
+    writer = None
+    if fieldnames:
+        writer = csv.DictWriter(buffer, fieldnames=list(fieldnames))
+        writer.writeheader()
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    for rows in batches:
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow({k: _plain(v) for k, v in row.items()})
+        chunk = buffer.getvalue()
+        if chunk:
+            yield chunk
+        buffer.seek(0)
+        buffer.truncate()
+
+def ndjson_stream(batches, fieldnames=None):
+    for rows in batches:
+        if rows:
+            yield "".join(json.dumps(row, default=_plain) + "\n" for row in rows)
+
+# format -> (mimetype, encoder)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", csv_stream),
+    "ndjson": ("application/x-ndjson", ndjson_stream),
+}
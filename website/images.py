@@ -0,0 +1,202 @@
+# ======================================================================= #
+#                          RESPONSIVE IMAGES                              #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (images.py) makes smaller copies of everything in             #
+# static/images and the Jinja helpers that pick between them.             #
+# `python -m website.images` (on deploy, next to website.assets) writes   #
+#                                                                         #
+#   static/dist/img/<source hash>/<name>-<width>.<avif|webp|png|jpg>      #
+#   static/dist/img/images.json     sizes + variants per source image     #
+#                                                                         #
+# for every width in WIDTHS below the original (plus the original width). #
+# The directory is keyed by the source's content hash: unchanged images   #
+# are skipped, an edited one gets a new directory (and, being under       #
+# dist/, the immutable caching from assets.py). The previous build's      #
+# directories are kept (images.prev.json) for workers not restarted yet.  #
+# AVIF needs a Pillow with libavif, without it only WebP + the original   #
+# format are made.                                                        #
+#                                                                         #
+# In templates:                                                           #
+#   {{ picture('images/Fig4.png', alt='...', sizes='...') }}              #
+#       -> <picture> with avif/webp sources, srcset, width/height         #
+#          and lazy loading                                               #
+#   background-image: {{ image_set('images/x.jpg') }}   (CSS)             #
+# An image missing from images.json falls back to a plain <img> / url().  #
+# ======================================================================= #
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+try:
+    from PIL import Image, features
+except ImportError:     # only the build needs it, the helpers read images.json
+    Image = None
+
+from .assets import DIST, STATIC_DIR
+
+IMAGE_DIR = "images"
+CACHE = f"{DIST}/img"
+MANIFEST = os.path.join(STATIC_DIR, *CACHE.split("/"), "images.json")
+PREVIOUS = os.path.join(STATIC_DIR, *CACHE.split("/"), "images.prev.json")
+WIDTHS = (480, 960, 1440)
+SOURCES = {".png", ".jpg", ".jpeg"}
+# (format, mimetype, save options), best first
+FORMATS = (
+    ("avif", "image/avif", {"quality": 55}),
+    ("webp", "image/webp", {"quality": 80, "method": 6}),
+)
+FALLBACK_OPTIONS = {"png": {"optimize": True}, "jpg": {"quality": 82, "optimize": True,
+                                                      "progressive": True}}
+
+
+def _formats():
+    return [f for f in FORMATS if features.check(f[0])]
+
+def _source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+def _derive(name, path, digest):
+    # every variant of one source image, written into its hash directory
+    stem, ext = os.path.splitext(os.path.basename(name))
+    fallback = "jpg" if ext.lower() in (".jpg", ".jpeg") else "png"
+    out_dir = os.path.join(STATIC_DIR, *CACHE.split("/"), digest)
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    with Image.open(path) as original:
+        original.load()
+        width, height = original.size
+        widths = sorted({w for w in WIDTHS if w < width} | {width})
+        variants = {}
+        for fmt, _, options in _formats() + [(fallback, None, FALLBACK_OPTIONS[fallback])]:
+            variants[fmt] = []
+            for w in widths:
+                image = original
+                if w != width:
+                    image = original.resize((w, round(height * w / width)), Image.LANCZOS)
+                if fmt == "jpg" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                filename = f"{stem}-{w}.{fmt}"
+                image.save(os.path.join(tmp_dir, filename),
+                           "JPEG" if fmt == "jpg" else fmt.upper(), **options)
+                variants[fmt].append((w, f"{CACHE}/{digest}/{filename}"))
+    os.replace(tmp_dir, out_dir)
+    return {"hash": digest, "width": width, "height": height, "variants": variants}
+
+def build():
+    """Derive every source image not derived yet, returns the manifest."""
+    if Image is None:
+        raise SystemExit("Pillow is not installed (pip install pillow)")
+    previous = load_manifest()
+    manifest = {}
+    for root, _, files in os.walk(os.path.join(STATIC_DIR, IMAGE_DIR)):
+        for filename in sorted(files):
+            if os.path.splitext(filename)[1].lower() not in SOURCES:
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            digest = _source_hash(path)
+            done = previous.get(name)
+            if done and done["hash"] == digest and \
+                    os.path.isdir(os.path.join(STATIC_DIR, *CACHE.split("/"), digest)):
+                manifest[name] = done
+            else:
+                manifest[name] = _derive(name, path, digest)
+    os.makedirs(os.path.dirname(MANIFEST), exist_ok=True)
+    # a rebuild with nothing changed keeps the older previous build
+    if previous and previous != manifest:
+        _save(PREVIOUS, previous)
+    _save(MANIFEST, manifest)
+    _prune(manifest)
+    return manifest
+
+def _save(path, manifest):
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def _prune(manifest):
+    # hash directories of this build and the one before stay
+    keep = {entry["hash"] for m in (manifest, load_manifest(PREVIOUS)) for entry in m.values()}
+    cache_dir = os.path.join(STATIC_DIR, *CACHE.split("/"))
+    for entry in os.listdir(cache_dir) if os.path.isdir(cache_dir) else ():
+        if os.path.isdir(os.path.join(cache_dir, entry)) and entry not in keep:
+            shutil.rmtree(os.path.join(cache_dir, entry))
+
+def load_manifest(path=MANIFEST):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# ---------- template helpers ----------
+def _srcset(variants):
+    return ", ".join(f"{url_for('static', filename=path)} {w}w" for w, path in variants)
+
+def _attrs(attrs):
+    return "".join(f' {escape(k.rstrip("_").replace("_", "-"))}="{escape(v)}"'
+                   for k, v in attrs.items() if v is not None)
+
+def picture(manifest, name, alt="", sizes="100vw", loading="lazy", **attrs):
+    entry = manifest.get(name)
+    if entry is None:
+        return Markup(f'<img src="{url_for("static", filename=name)}"'
+                      f'{_attrs(dict(attrs, alt=alt, loading=loading))}>')
+    sources = "".join(
+        f'<source type="{mimetype}" srcset="{_srcset(entry["variants"][fmt])}" sizes="{escape(sizes)}">'
+        for fmt, mimetype, _ in FORMATS if fmt in entry["variants"])
+    fallback = next(v for fmt, v in entry["variants"].items()
+                    if fmt not in {f[0] for f in FORMATS})
+    img_attrs = dict(attrs, alt=alt, width=entry["width"], height=entry["height"],
+                     loading=loading, decoding="async", sizes=sizes)
+    return Markup(f'<picture>{sources}<img src="{url_for("static", filename=fallback[-1][1])}"'
+                  f' srcset="{_srcset(fallback)}"{_attrs(img_attrs)}></picture>')
+
+def image_set(manifest, name, width=None):
+    # CSS image-set() of each format at `width` (default the largest), put it
+    # after a plain url() declaration for browsers without image-set()
+    entry = manifest.get(name)
+    if entry is None:
+        return Markup(f'url({url_for("static", filename=name)})')
+    options = []
+    for fmt, variants in entry["variants"].items():
+        mimetype = next((f[1] for f in FORMATS if f[0] == fmt), f"image/{fmt.replace('jpg', 'jpeg')}")
+        w, path = next(((w, p) for w, p in variants if width and w >= width), variants[-1])
+        options.append((fmt not in {f[0] for f in FORMATS},
+                        f"url({url_for('static', filename=path)}) type('{mimetype}')"))
+    # best formats first, the browser takes the first type it supports
+    return Markup(f'image-set({", ".join(o for _, o in sorted(options, key=lambda o: o[0]))})')
+
+def init_app(app):
+    manifest = load_manifest()
+    app.jinja_env.globals["picture"] = lambda name, **kw: picture(manifest, name, **kw)
+    app.jinja_env.globals["image_set"] = lambda name, **kw: image_set(manifest, name, **kw)
+
+def main(argv=None):
+    started = load_manifest()
+    manifest = build()
+    made = [name for name, entry in manifest.items()
+            if started.get(name, {}).get("hash") != entry["hash"]]
+    before = sum(os.path.getsize(os.path.join(STATIC_DIR, n)) for n in manifest)
+    smallest = 0
+    for entry in manifest.values():
+        smallest += min(os.path.getsize(os.path.join(STATIC_DIR, *v[0][1].split("/")))
+                        for v in entry["variants"].values())
+    print(f"{len(manifest)} images ({len(made)} derived, the rest cached), "
+          f"formats: {', '.join(f[0] for f in _formats()) or 'fallback only'}; "
+          f"{before} bytes at full size, {smallest} at the smallest variants")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,264 @@
+# ======================================================================= #
+#                        GYMMAN: BULK MEMBER IMPORT                       #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (importer.py) onboards a whole roster from CSV (ie. migrating #
+# another gym's members) instead of one new_member form at a time.        #
+#                                                                         #
+#   1. rows are read + validated one at a time (the file never has to fit #
+#      in memory), bad rows are reported and skipped                      #
+#   2. passwords are hashed across a process pool -- hashing is CPU bound #
+#      and holds the GIL, threads wouldn't help. the next batch hashes    #
+#      while the current one is being inserted                            #
+#   3. each batch is inserted with multi-row INSERTs and ONE commit; if a #
+#      batch fails it is retried row by row so only the bad rows are lost #
+#                                                                         #
+# CSV header (extra columns are ignored):                                 #
+#   first_name,last_name,birth_date,email,sex,username,password           #
+#   [optional] membership_start_date,phone_number,phone_number_type       #
+#                                                                         #
+# Usage:                                                                  #
+#   python -m website.importer roster.csv [--batch-size 500]              #
+#          [--workers N] [--errors errors.csv] [--dry-run]                #
+# ======================================================================= #
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from werkzeug.security import generate_password_hash
+
+from .models import get_db
+
+REQUIRED = ("first_name", "last_name", "birth_date", "email", "sex", "username", "password")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class RowError(Exception):
+    pass
+
+
+def _parse_date(value, field):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"{field} must be yyyy-mm-dd, got {value!r}")
+
+# clean + validate one CSV row, raises RowError
+def validate_row(row):
+    row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+    missing = [f for f in REQUIRED if not row.get(f)]
+    if missing:
+        raise RowError("missing " + ", ".join(missing))
+    if not _EMAIL.match(row["email"]):
+        raise RowError(f"invalid email {row['email']!r}")
+
+    birth_date = _parse_date(row["birth_date"], "birth_date")
+    if birth_date >= date.today():
+        raise RowError("birth_date must be before today")
+    start_date = date.today()
+    if row.get("membership_start_date"):
+        start_date = _parse_date(row["membership_start_date"], "membership_start_date")
+        if start_date < birth_date:
+            raise RowError("membership_start_date is before birth_date")
+
+    return {
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "birth_date": birth_date,
+        "membership_start_date": start_date,
+        "email": row["email"].lower(),
+        "sex": row["sex"],
+        "username": row["username"],
+        "password": row["password"],
+        "phone_number": row.get("phone_number") or None,
+        "phone_number_type": row.get("phone_number_type") or "mobile",
+    }
+
+# yield (csv line number, member dict) for good rows, report the bad ones.
+# also rejects usernames / emails repeated within the file itself
+def read_rows(path, report):
+    seen_usernames, seen_emails = set(), set()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            line_no = reader.line_num
+            try:
+                member = validate_row(row)
+                if member["username"].lower() in seen_usernames:
+                    raise RowError(f"duplicate username {member['username']!r} in file")
+                if member["email"] in seen_emails:
+                    raise RowError(f"duplicate email {member['email']!r} in file")
+            except RowError as e:
+                report(line_no, str(e))
+                continue
+            seen_usernames.add(member["username"].lower())
+            seen_emails.add(member["email"])
+            yield line_no, member
+
+def _batches(rows, size):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# drop rows whose username / email is already taken in the DB (one query)
+def _filter_existing(cursor, batch, report):
+    usernames = [m["username"] for _, m in batch]
+    emails = [m["email"] for _, m in batch]
+    cursor.execute(f"""
+        SELECT LOWER(username), LOWER(email) FROM users
+        WHERE username IN ({", ".join(["%s"] * len(usernames))})
+           OR email IN ({", ".join(["%s"] * len(emails))})
+    """, tuple(usernames + emails))
+    taken_usernames, taken_emails = set(), set()
+    for username, email in cursor.fetchall():
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    kept = []
+    for line_no, m in batch:
+        if m["username"].lower() in taken_usernames:
+            report(line_no, f"username {m['username']!r} already exists")
+        elif m["email"] in taken_emails:
+            report(line_no, f"email {m['email']!r} already exists")
+        else:
+            kept.append((line_no, m))
+    return kept
+
+def _insert(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO Members(first_name, last_name, birth_date, membership_start_date, email, sex)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [(m["first_name"], m["last_name"], m["birth_date"], m["membership_start_date"],
+           m["email"], m["sex"]) for m in rows])
+    cursor.executemany("""
+        INSERT INTO users (username, password_hash, role_id, first_name, last_name, email)
+        VALUES (%s, %s, 3, %s, %s, %s)
+    """, [(m["username"], m["password_hash"], m["first_name"], m["last_name"], m["email"])
+          for m in rows])
+
+    with_phone = [m for m in rows if m["phone_number"]]
+    if with_phone:
+        # multi-row INSERT ids aren't guaranteed consecutive, map them back by email
+        cursor.execute(f"""
+            SELECT member_id, email FROM Members
+            WHERE email IN ({", ".join(["%s"] * len(with_phone))})
+            ORDER BY member_id
+        """, tuple(m["email"] for m in with_phone))
+        ids = {email.lower(): member_id for member_id, email in cursor.fetchall()}
+        cursor.executemany("""
+            INSERT INTO PhoneNumbers (member_id, phone_number, phone_number_type)
+            VALUES (%s, %s, %s)
+        """, [(ids[m["email"]], m["phone_number"], m["phone_number_type"]) for m in with_phone])
+
+# insert one hashed batch with a single commit, falling back to row by row
+def _write_batch(batch, report):
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        batch = _filter_existing(cursor, batch, report)
+        if not batch:
+            return 0
+        try:
+            _insert(cursor, [m for _, m in batch])
+            db.commit()
+            return len(batch)
+        except Exception:
+            db.rollback()
+
+        written = 0
+        for line_no, m in batch:
+            try:
+                _insert(cursor, [m])
+                db.commit()
+                written += 1
+            except Exception as e:
+                db.rollback()
+                report(line_no, f"insert failed: {e}")
+        return written
+    finally:
+        cursor.close()
+        db.close()
+
+def _hash_batch(executor, batch, chunksize):
+    passwords = [m["password"] for _, m in batch]
+    return executor.map(generate_password_hash, passwords, chunksize=chunksize)
+
+def import_members(path, batch_size=500, workers=None, dry_run=False,
+                   report=None, progress=None):
+    errors = []
+    def _report(line_no, message):
+        errors.append((line_no, message))
+        if report:
+            report(line_no, message)
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, batch_size // (workers * 4))
+    imported = processed = 0
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = _batches(read_rows(path, _report), batch_size)
+        current = next(batches, None)
+        hashes = _hash_batch(executor, current, chunksize) if current else None
+        while current is not None:
+            # kick off hashing of the next batch before writing this one
+            upcoming = next(batches, None)
+            upcoming_hashes = _hash_batch(executor, upcoming, chunksize) if upcoming else None
+
+            for (_, m), pw_hash in zip(current, hashes):
+                m["password_hash"] = pw_hash
+                m.pop("password")
+            processed += len(current)
+            if not dry_run:
+                imported += _write_batch(current, _report)
+            if progress:
+                progress(processed, imported, len(errors), time.monotonic() - started)
+
+            current, hashes = upcoming, upcoming_hashes
+
+    return imported, errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import members from a CSV roster.")
+    parser.add_argument("csv_path")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="password hashing processes (default: CPU count)")
+    parser.add_argument("--errors", help="write rejected rows to this CSV")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="validate + hash only, don't touch the database")
+    args = parser.parse_args(argv)
+
+    def progress(processed, imported, errors, elapsed):
+        rate = processed / elapsed if elapsed else 0
+        print(f"{processed} rows processed, {imported} imported, {errors} errors "
+              f"({rate:.0f} rows/s)", file=sys.stderr)
+
+    imported, errors = import_members(
+        args.csv_path, batch_size=args.batch_size, workers=args.workers,
+        dry_run=args.dry_run, progress=progress)
+
+    if args.errors:
+        with open(args.errors, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line", "error"])
+            writer.writerows(errors)
+    else:
+        for line_no, message in errors:
+            print(f"line {line_no}: {message}", file=sys.stderr)
+
+    print(f"done: {imported} members imported, {len(errors)} rows rejected.")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
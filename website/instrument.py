@@ -0,0 +1,214 @@
+# ======================================================================= #
+#                       GYMMAN: SQL INSTRUMENTATION                       #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (instrument.py) times every statement that goes through a     #
+# cursor from get_db(). For each one it records the normalized SQL, the   #
+# number of parameters, wall time, rows and which db_* model (or route)   #
+# ran it. That feeds:                                                     #
+#                                                                         #
+#   - per request totals (queries + SQL time), rolled up per route        #
+#   - per db_* function latency samples (p50 / p95 / p99)                 #
+#   - a ring buffer of the slowest offenders (>= SLOW_QUERY_MS)           #
+#                                                                         #
+# Everything lives in-process (per gunicorn worker); the owner can read   #
+# it at /owner/sql-stats (POST there to reset). Tunables (db.env):        #
+#   SQL_INSTRUMENTATION   1/0, on by default                              #
+#   SLOW_QUERY_MS         slow query threshold          (default 100)     #
+#   SLOW_QUERY_LOG_SIZE   slow queries kept             (default 200)     #
+# ======================================================================= #
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from flask import g, has_request_context, request
+
+ENABLED = os.getenv("SQL_INSTRUMENTATION", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 200))
+SAMPLES_PER_FUNCTION = 1000
+
+_WS = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"IN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+
+# one line, literals -> ?, "IN (%s, %s, ...)" -> "IN (...)" so the same
+# query with different values / list lengths groups together
+def normalize(sql):
+    sql = _WS.sub(" ", sql).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _IN_LIST.sub("IN (...)", sql)
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+# the db_* model that issued the query, or failing that the first frame in
+# this package outside the db plumbing (ie. a route running inline SQL)
+_PLUMBING = {"instrument.py", "pool.py"}
+def _caller():
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        name = frame.f_code.co_name
+        if name.startswith("db_"):
+            return name
+        filename = os.path.basename(frame.f_code.co_filename)
+        if (fallback is None and filename not in _PLUMBING
+                and f"{os.sep}website{os.sep}" in frame.f_code.co_filename):
+            fallback = f"{filename[:-3]}.{name}"
+        frame = frame.f_back
+    return fallback or "?"
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.routes = defaultdict(lambda: {
+                "requests": 0, "queries": 0, "sql_ms": 0.0, "max_queries": 0,
+                "statements": defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}),
+            })
+            self.functions = defaultdict(lambda: deque(maxlen=SAMPLES_PER_FUNCTION))
+            self.slow = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+    # params is one statement's parameters; an executemany passes its first
+    # row's and the number of rows as batch
+    def record(self, sql, params, elapsed_ms, rows, caller, batch=None):
+        entry = {
+            "sql": normalize(sql),
+            "params": len(params) if params else 0,
+            "ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "caller": caller,
+        }
+        if batch is not None:
+            entry["batch"] = batch
+        route = None
+        if has_request_context():
+            route = request.endpoint or request.path
+            g.setdefault("_sql_queries", []).append(entry)
+        with self._lock:
+            self.functions[caller].append(elapsed_ms)
+            if elapsed_ms >= SLOW_QUERY_MS:
+                self.slow.append(dict(entry, route=route or "<background>",
+                                      at=datetime.now().isoformat(timespec="seconds")))
+        return entry
+
+    # roll one finished request's queries into its route summary
+    def finish_request(self, route, queries):
+        with self._lock:
+            summary = self.routes[route]
+            summary["requests"] += 1
+            summary["queries"] += len(queries)
+            summary["max_queries"] = max(summary["max_queries"], len(queries))
+            for q in queries:
+                summary["sql_ms"] += q["ms"]
+                stmt = summary["statements"][q["sql"]]
+                stmt["count"] += 1
+                stmt["total_ms"] += q["ms"]
+                stmt["max_ms"] = max(stmt["max_ms"], q["ms"])
+                if q["rows"] and q["rows"] > 0:
+                    stmt["rows"] += q["rows"]
+
+    def route_summary(self):
+        with self._lock:
+            out = {}
+            for route, s in self.routes.items():
+                n = s["requests"] or 1
+                out[route] = {
+                    "requests": s["requests"],
+                    "avg_queries": round(s["queries"] / n, 2),
+                    "max_queries": s["max_queries"],
+                    "avg_sql_ms": round(s["sql_ms"] / n, 3),
+                    "statements": sorted(
+                        ({"sql": sql, **{k: round(v, 3) for k, v in st.items()}}
+                         for sql, st in s["statements"].items()),
+                        key=lambda st: -st["total_ms"]),
+                }
+            return out
+
+    def function_summary(self):
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self.functions.items()}
+        out = {}
+        for name, values in samples.items():
+            out[name] = {
+                "calls": len(values),
+                "p50_ms": round(_percentile(values, 50), 3),
+                "p95_ms": round(_percentile(values, 95), 3),
+                "p99_ms": round(_percentile(values, 99), 3),
+                "max_ms": round(values[-1], 3) if values else 0.0,
+            }
+        return dict(sorted(out.items(), key=lambda kv: -kv[1]["p99_ms"]))
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self.slow)[::-1]
+
+stats = QueryStats()
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute()/executemany() into `stats`."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        cursor = self.__dict__.get("_cursor")
+        if cursor is None:
+            raise AttributeError(name)
+        return getattr(cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def _timed(self, call, operation, params, batch=None):
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats.record(operation, params, elapsed_ms, self._cursor.rowcount, _caller(),
+                         batch=batch)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._timed(lambda: self._cursor.execute(operation, params, *args, **kwargs),
+                           operation, params)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        return self._timed(lambda: self._cursor.executemany(operation, seq_params, *args, **kwargs),
+                           operation, seq_params[0] if seq_params else None,
+                           batch=len(seq_params))
+
+def wrap_cursor(cursor):
+    return InstrumentedCursor(cursor) if ENABLED else cursor
+
+def _finish_request(exc=None):
+    queries = g.pop("_sql_queries", [])
+    if request.endpoint != "static":
+        stats.finish_request(request.endpoint or request.path, queries)
+
+def init_app(app):
+    if ENABLED:
+        app.teardown_request(_finish_request)
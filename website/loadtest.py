@@ -0,0 +1,345 @@
+# ======================================================================= #
+#                           GYMMAN: LOAD TEST                             #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (loadtest.py) hammers the GymMan routes over real HTTP and    #
+# reports p50 / p95 / p99 latency and throughput per route, so we know    #
+# where the app falls over before a membership drive, not after.          #
+#                                                                         #
+# By default the app from create_app() is served in this process by a     #
+# threaded werkzeug server on a free port; --url points it at a running   #
+# gunicorn instead (the dependencies.sh setup). Either way it needs a     #
+# SEEDED local database (seed.py), whose logins it uses:                  #
+#                                                                         #
+#   - --concurrency virtual users, each picks a role by --roles weight,   #
+#     logs in, then requests that role's SCENARIOS (by weight) back to    #
+#     back, logging in again every --session-requests requests            #
+#   - member names / ids for lookups and check-ins come from the DB       #
+#   - check-in POSTs really insert rows, payment POSTs only search        #
+#                                                                         #
+# A redirect back to the login page or a 5xx counts as an error.          #
+#                                                                         #
+# Usage:                                                                  #
+#   python -m website.loadtest [--concurrency 16] [--duration 30]         #
+#          [--roles owner=4,staff=3,trainer=2,member=1] [--url URL]       #
+#          [--only memberships] [--json out.json]                         #
+# ======================================================================= #
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from . import create_app
+from .instrument import _percentile
+from .models import get_db
+
+LOGIN_PATH = "/gymman-login"
+DEFAULT_USERS = {"owner": "seed-owner", "staff": "seed-staff", "trainer": "seed-trainer"}
+
+
+def _name(s):
+    return s["last_name"]
+
+def _prefix(s):
+    return s["last_name"][:3]
+
+# role -> [(route label, weight, request(sample) -> (method, path, form))]
+SCENARIOS = {
+    "owner": [
+        ("GET /owner/dashboard", 10, lambda s: ("GET", "/owner/dashboard", None)),
+        ("GET /owner/memberships", 4, lambda s: ("GET", "/owner/memberships", None)),
+        ("POST /owner/memberships lookup", 12, lambda s: (
+            "POST", "/owner/memberships", {"lookup": "1", "member_search": _name(s)})),
+        ("POST /owner/memberships checkin", 8, lambda s: (
+            "POST", "/owner/memberships", {"checkin": "1", "member_search": str(s["member_id"])})),
+        ("GET /owner/memberships/directory", 3, lambda s: (
+            "GET", "/owner/memberships/directory?" + urlencode({"q": _prefix(s)}), None)),
+        ("GET /owner/payments", 4, lambda s: ("GET", "/owner/payments", None)),
+        ("POST /owner/payments search member", 6, lambda s: (
+            "POST", "/owner/payments", {"search_payment": "1", "search_member": _name(s)})),
+        ("POST /owner/payments search dates", 4, lambda s: (
+            "POST", "/owner/payments", {
+                "search_payment": "1", "status_filter": "complete",
+                "date_from": (date.today() - timedelta(days=30)).isoformat(),
+                "date_to": date.today().isoformat()})),
+        ("GET /owner/trainers", 2, lambda s: ("GET", "/owner/trainers", None)),
+        ("GET /owner/checkins/analytics", 1, lambda s: ("GET", "/owner/checkins/analytics?days=30", None)),
+    ],
+    "staff": [
+        ("GET /staff/dashboard", 4, lambda s: ("GET", "/staff/dashboard", None)),
+        ("GET /staff/checkins", 8, lambda s: ("GET", "/staff/checkins", None)),
+        ("POST /staff/checkins", 12, lambda s: (
+            "POST", "/staff/checkins", {"member_search": str(s["member_id"])})),
+        ("POST /staff/checkins by name", 4, lambda s: (
+            "POST", "/staff/checkins", {"member_search": f"{s['first_name']} {s['last_name']}"})),
+    ],
+    "trainer": [
+        ("GET /trainer/dashboard", 3, lambda s: ("GET", "/trainer/dashboard", None)),
+        ("GET /trainer/clients", 6, lambda s: ("GET", "/trainer/clients", None)),
+        ("GET /trainer/reports", 3, lambda s: ("GET", "/trainer/reports", None)),
+    ],
+    "member": [
+        ("GET /member/dashboard", 5, lambda s: ("GET", "/member/dashboard", None)),
+        ("GET /member/workouts", 2, lambda s: ("GET", "/member/workouts", None)),
+        ("GET /member/payments", 2, lambda s: ("GET", "/member/payments", None)),
+    ],
+}
+
+
+def _sample_members(limit=500):
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT MIN(member_id) AS lo, MAX(member_id) AS hi FROM Members")
+    bounds = cursor.fetchone()
+    if bounds["lo"] is None:
+        raise SystemExit("no members in the database, run `python -m website.seed` first")
+    start = random.randint(bounds["lo"], max(bounds["lo"], bounds["hi"] - limit))
+    cursor.execute("""
+        SELECT member_id, first_name, last_name
+        FROM Members
+        WHERE member_id >= %s
+        ORDER BY member_id
+        LIMIT %s
+    """, (start, limit))
+    members = cursor.fetchall()
+    cursor.execute("""
+        SELECT username FROM users
+        WHERE role_id = 3 AND username LIKE 'member%%'
+        ORDER BY user_id
+        LIMIT 1
+    """)
+    member_user = cursor.fetchone()
+    cursor.close()
+    db.close()
+    return members, member_user["username"] if member_user else None
+
+
+class _Client:
+    """One virtual user: a keep-alive connection plus the session cookie."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self._conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        self._cookies = SimpleCookie()
+
+    def request(self, method, path, form=None):
+        headers = {"Referer": path}     # check-ins redirect back to the referrer
+        if self._cookies:
+            headers["Cookie"] = "; ".join(f"{k}={m.value}" for k, m in self._cookies.items())
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            self._conn.request(method, path, body, headers)
+            response = self._conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self._conn.close()      # the server dropped keep-alive, retry once
+            self._conn.request(method, path, body, headers)
+            response = self._conn.getresponse()
+            response.read()
+        for cookie in response.headers.get_all("Set-Cookie") or ():
+            self._cookies.load(cookie)
+        return response.status, response.getheader("Location") or ""
+
+    def close(self):
+        self._conn.close()
+
+
+class _Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.times = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+
+    def add(self, route, ms, error=None):
+        with self._lock:
+            self.times[route].append(ms)
+            if error:
+                self.errors[route] += 1
+                self.error_samples.setdefault(route, error)
+
+    def summary(self, elapsed):
+        routes = {}
+        for route, times in sorted(self.times.items()):
+            times = sorted(times)
+            routes[route] = {
+                "requests": len(times),
+                "errors": self.errors[route],
+                "rps": round(len(times) / elapsed, 2),
+                "p50_ms": round(_percentile(times, 50), 1),
+                "p95_ms": round(_percentile(times, 95), 1),
+                "p99_ms": round(_percentile(times, 99), 1),
+                "max_ms": round(times[-1], 1),
+            }
+        total = sum(len(t) for t in self.times.values())
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "rps": round(total / elapsed, 2) if elapsed else 0,
+            "routes": routes,
+            "error_samples": dict(self.error_samples),
+        }
+
+
+def _timed(client, results, route, method, path, form=None):
+    started = time.perf_counter()
+    try:
+        status, location = client.request(method, path, form)
+    except Exception as e:
+        results.add(route, (time.perf_counter() - started) * 1000, f"{type(e).__name__}: {e}")
+        return False
+    ms = (time.perf_counter() - started) * 1000
+    error = None
+    if status >= 500:
+        error = f"HTTP {status}"
+    elif status in (301, 302, 303) and urlsplit(location).path == LOGIN_PATH:
+        error = "redirected to login"
+    results.add(route, ms, error)
+    return error is None
+
+def _login(client, results, username, password):
+    # a wrong password also redirects to the login page, that's the failure
+    return _timed(client, results, f"POST {LOGIN_PATH}", "POST", LOGIN_PATH,
+                  {"username": username, "password": password})
+
+def _virtual_user(base_url, role, username, password, scenarios, members, deadline,
+                  session_requests, results, rng):
+    client = _Client(base_url)
+    weights = [w for _, w, _ in scenarios]
+    try:
+        while time.monotonic() < deadline:
+            if not _login(client, results, username, password):
+                time.sleep(0.5)     # don't spin on bad credentials
+                continue
+            for _ in range(session_requests):
+                if time.monotonic() >= deadline:
+                    break
+                route, _, build = rng.choices(scenarios, weights=weights)[0]
+                method, path, form = build(rng.choice(members))
+                _timed(client, results, route, method, path, form)
+    finally:
+        client.close()
+
+def _parse_pairs(value):
+    pairs = {}
+    for item in filter(None, (v.strip() for v in value.split(","))):
+        key, _, val = item.partition("=")
+        pairs[key.strip()] = val.strip()
+    return pairs
+
+def run(base_url, users, password, roles, concurrency=16, duration=30, session_requests=50,
+        only=None, seed=None):
+    """Drive base_url for `duration` seconds, returns the summary dict."""
+    members, member_user = _sample_members()
+    users = dict(users)
+    if member_user:
+        users.setdefault("member", member_user)
+    scenarios = {}
+    for role in roles:
+        picked = [s for s in SCENARIOS[role] if not only or any(o in s[0] for o in only)]
+        if picked and users.get(role):
+            scenarios[role] = picked
+    if not scenarios:
+        raise SystemExit("nothing to run: no scenario matches --only / --roles with a login")
+    role_names = list(scenarios)
+    role_weights = [roles[r] for r in role_names]
+
+    rng = random.Random(seed)
+    results = _Results()
+    deadline = time.monotonic() + duration
+    threads = []
+    for i in range(concurrency):
+        role = rng.choices(role_names, weights=role_weights)[0]
+        thread = threading.Thread(
+            target=_virtual_user, daemon=True, name=f"vu-{i}-{role}",
+            args=(base_url, role, users[role], password, scenarios[role], members, deadline,
+                  session_requests, results, random.Random(rng.random())))
+        threads.append(thread)
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = results.summary(time.monotonic() - started)
+    summary["concurrency"] = concurrency
+    summary["users"] = {r: sum(t.name.endswith("-" + r) for t in threads) for r in role_names}
+    return summary
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass    # one access log line per request would drown the report
+
+
+def _serve():
+    app = create_app()
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the GymMan routes, per-route percentiles.")
+    parser.add_argument("--url", help="running server to test (default: serve create_app() here)")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users (default 16)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds (default 30)")
+    parser.add_argument("--roles", default="owner=4,staff=3,trainer=2,member=1",
+                        help="share of virtual users per role")
+    parser.add_argument("--users", default="",
+                        help="role=username logins (default the seed.py ones)")
+    parser.add_argument("--password", default="password", help="password of those logins")
+    parser.add_argument("--session-requests", type=int, default=50,
+                        help="requests per login (default 50)")
+    parser.add_argument("--only", help="comma separated substrings of route labels to run")
+    parser.add_argument("--seed", type=int, help="random seed for the request mix")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args(argv)
+
+    roles = {role: float(weight) for role, weight in _parse_pairs(args.roles).items()}
+    unknown = set(roles) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"unknown role(s): {', '.join(sorted(unknown))}")
+    users = dict(DEFAULT_USERS, **_parse_pairs(args.users))
+    only = args.only.split(",") if args.only else None
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = _serve()
+    try:
+        print(f"{args.concurrency} virtual users against {base_url} for {args.duration:g}s...",
+              file=sys.stderr)
+        summary = run(base_url, users, args.password, roles, args.concurrency, args.duration,
+                      args.session_requests, only, args.seed)
+    finally:
+        if server:
+            server.shutdown()
+
+    print(f"{'route':40} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for route, r in summary["routes"].items():
+        print(f"{route:40} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} {r['p50_ms']:>8.1f}"
+              f" {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    print(f"\n{summary['requests']} requests, {summary['errors']} errors in {summary['elapsed_s']}s"
+          f" = {summary['rps']} req/s  (users: "
+          + ", ".join(f"{n} {r}" for r, n in summary["users"].items()) + ")")
+    for route, error in summary["error_samples"].items():
+        print(f"  first error on {route}: {error}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# ======================================================================= #
+#                        GYMMAN: SCHEMA MIGRATIONS                        #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (migrations.py) holds the versioned schema changes the app    #
+# depends on. Each migration runs once; applied versions are recorded in  #
+# the schema_migrations table so re-running is safe.                      #
+#                                                                         #
+# Usage (uses the same db.env as the app):                                #
+#   python -m website.migrations            apply everything pending      #
+#   python -m website.migrations --status   list applied / pending        #
+# ======================================================================= #
+
+import sys
+
+from .models import (get_db, PAYMENT_STATUSES, EXERCISE_ROLLUP_COLUMNS, EXERCISE_ROLLUP_SQL,
+                     REVENUE_ROLLUP_SQL)
+
+# (version, name, [statements]) -- append only, never edit an applied one.
+# MySQL commits DDL implicitly, so a migration that dies halfway has to be
+# finished by hand before it can be marked applied.
+MIGRATIONS = [
+    (1, "canonical payment status + (status, payment_date) index", [
+        # fold every spelling the app has ever written into the enum values
+        """
+        UPDATE Payments SET status = 'complete'
+        WHERE LOWER(status) IN ('complete', 'completed', 'paid')
+        """,
+        "UPDATE Payments SET status = 'pending' WHERE LOWER(status) = 'pending'",
+        "UPDATE Payments SET status = 'failed' WHERE LOWER(status) = 'failed'",
+        # anything else is unknown, park it as pending so the owner reviews it
+        """
+        UPDATE Payments SET status = 'pending'
+        WHERE status IS NULL OR status NOT IN ({})
+        """.format(", ".join(f"'{s}'" for s in PAYMENT_STATUSES)),
+        """
+        ALTER TABLE Payments
+        MODIFY status ENUM({}) NOT NULL DEFAULT 'pending'
+        """.format(", ".join(f"'{s}'" for s in PAYMENT_STATUSES)),
+        "CREATE INDEX idx_payments_status_date ON Payments (status, payment_date)",
+    ]),
+    (2, "ErrorLogs table", [
+        """
+        CREATE TABLE ErrorLogs (
+            error_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            logged_at DATETIME(6) NOT NULL,
+            level VARCHAR(16) NOT NULL,
+            logger VARCHAR(128),
+            route VARCHAR(128),
+            path VARCHAR(512),
+            method VARCHAR(8),
+            username VARCHAR(64),
+            exception_type VARCHAR(128),
+            message TEXT,
+            traceback TEXT,
+            INDEX idx_errorlogs_logged_at (logged_at),
+            INDEX idx_errorlogs_route (route, logged_at),
+            INDEX idx_errorlogs_exception (exception_type, logged_at)
+        )
+        """,
+    ]),
+    (3, "users.staff_id link to Staff", [
+        "ALTER TABLE users ADD COLUMN staff_id INT NULL",
+        "CREATE INDEX idx_users_staff_id ON users (staff_id)",
+        # link existing staff / trainer accounts whose name matches exactly ONE
+        # Staff row, ambiguous ones are left for the owner to set by hand
+        """
+        UPDATE users u
+        JOIN (
+            SELECT first_name, last_name, MIN(staff_id) AS staff_id
+            FROM Staff
+            GROUP BY first_name, last_name
+            HAVING COUNT(*) = 1
+        ) s ON s.first_name = u.first_name AND s.last_name = u.last_name
+        SET u.staff_id = s.staff_id
+        WHERE u.role_id IN (2, 4) AND u.staff_id IS NULL
+        """,
+    ]),
+    (4, "name + relationship indexes for trainer-client filtering", [
+        "CREATE INDEX idx_members_last_first ON Members (last_name, first_name)",
+        "CREATE INDEX idx_members_first ON Members (first_name)",
+        "CREATE INDEX idx_trainerclients_trainer_start ON TrainerClients (trainer_id, client_start_date)",
+        "CREATE INDEX idx_trainerclients_start ON TrainerClients (client_start_date)",
+    ]),
+    (5, "MemberExerciseStats rollup table", [
+        """
+        CREATE TABLE MemberExerciseStats (
+            member_id INT PRIMARY KEY,
+            workouts INT NOT NULL DEFAULT 0,
+            rpe_sum BIGINT NOT NULL DEFAULT 0,
+            rpe_count INT NOT NULL DEFAULT 0,
+            max_weight DECIMAL(10, 2) NULL,
+            run_distance_sum DECIMAL(14, 3) NOT NULL DEFAULT 0,
+            run_count INT NOT NULL DEFAULT 0,
+            last_workout_date DATE NULL,
+            FOREIGN KEY (member_id) REFERENCES Members(member_id) ON DELETE CASCADE
+        )
+        """,
+        # backfill from the raw tables
+        f"""
+        INSERT INTO MemberExerciseStats (member_id, {", ".join(EXERCISE_ROLLUP_COLUMNS)})
+        {EXERCISE_ROLLUP_SQL.format(where="")}
+        """,
+    ]),
+    (6, "RevenueDaily rollup table", [
+        """
+        CREATE TABLE RevenueDaily (
+            day DATE NOT NULL,
+            status ENUM({}) NOT NULL,
+            type VARCHAR(64) NOT NULL,
+            total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            payments INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status, type)
+        )
+        """.format(", ".join(f"'{s}'" for s in PAYMENT_STATUSES)),
+        REVENUE_ROLLUP_SQL,
+    ]),
+    # the lookup / join columns every db_* model filters on. TrainerClients
+    # by trainer_id is already covered by idx_trainerclients_trainer_start (004)
+    # -- check the plans with `python -m website.explain`
+    (7, "lookup + join indexes for the db_* query patterns", [
+        "CREATE INDEX idx_checkins_member ON Checkins (member_id, checkin_datetime)",
+        "CREATE INDEX idx_phonenumbers_member ON PhoneNumbers (member_id)",
+        "CREATE INDEX idx_emergencycontacts_member ON EmergencyContacts (member_id)",
+        "CREATE INDEX idx_trainerclients_member ON TrainerClients (member_id)",
+        "CREATE INDEX idx_users_email ON users (email)",
+        "CREATE INDEX idx_users_username ON users (username)",
+        "CREATE INDEX idx_exercises_member_date ON Exercises (member_id, exercise_date)",
+        "CREATE INDEX idx_payments_date ON Payments (payment_date)",
+        "CREATE INDEX idx_payments_member_date ON Payments (member_id, payment_date)",
+        "CREATE INDEX idx_members_email ON Members (email)",
+    ]),
+]
+
+def _ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def applied_versions():
+    db = get_db()
+    cursor = db.cursor()
+    _ensure_table(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    db.close()
+    return versions
+
+def pending_migrations():
+    applied = applied_versions()
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+# apply every pending migration in order, returns the versions applied
+def migrate(verbose=True):
+    done = []
+    for version, name, statements in pending_migrations():
+        if verbose:
+            print(f"applying {version:03d} {name} ...")
+        db = get_db()
+        cursor = db.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+            db.close()
+        done.append(version)
+    if verbose and not done:
+        print("schema is up to date.")
+    return done
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--status" in argv:
+        applied = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            mark = "applied" if version in applied else "pending"
+            print(f"{version:03d} [{mark}] {name}")
+        return 0
+    migrate()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,53 +15,236 @@
 from werkzeug.security import generate_password_hash
 import mysql.connector
 import os
+import re
 from dotenv import load_dotenv
+from .pool import get_connection, get_pool
+from .cache import TTLCache
+from .search import MemberIndex
+from .writebehind import WriteBehindBuffer
+from .revenue import RevenueIndex, BUCKETS as REVENUE_BUCKETS
+from .occupancy import CheckinColumns
+from datetime import datetime, timedelta
+import numpy as np
 
 env_path = os.path.join(os.path.dirname(__file__), "db.env")
 load_dotenv(env_path)
 
+# short lived cache for the owner dashboard counters, invalidated by the
+# models that change them (see db_getDashboardCounts)
+dashboard_cache = TTLCache(ttl=int(os.getenv("DASHBOARD_CACHE_TTL", 30)))
+DASHBOARD_KEY = "owner_dashboard_counts"
+
+# the only values Payments.status may hold (an ENUM since migration 001).
+# queries compare the bare column so the (status, payment_date) index is used
+PAYMENT_STATUSES = ("pending", "complete", "failed")
+_STATUS_ALIASES = {"completed": "complete", "paid": "complete"}
+
+# canonical status for whatever a form sent ('Paid', 'Completed', ...), or None
+def normalizePaymentStatus(status):
+    status = (status or "").strip().lower()
+    status = _STATUS_ALIASES.get(status, status)
+    return status if status in PAYMENT_STATUSES else None
+
+# rows the member search index is built from: (id, first, last, email, [phones]).
+# pass a member_id to reload just that member
+def _memberSearchRows(member_id=None):
+    db = get_db()
+    cursor = db.cursor()
+    where = "WHERE m.member_id = %s" if member_id is not None else ""
+    cursor.execute(f"""
+        SELECT m.member_id, m.first_name, m.last_name, m.email,
+               GROUP_CONCAT(p.phone_number SEPARATOR ',')
+        FROM Members m
+        LEFT JOIN PhoneNumbers p ON m.member_id = p.member_id
+        {where}
+        GROUP BY m.member_id, m.first_name, m.last_name, m.email
+    """, (member_id,) if member_id is not None else ())
+    rows = [
+        (mid, first, last, email, phones.split(",") if phones else [])
+        for mid, first, last, email, phones in cursor.fetchall()
+    ]
+    cursor.close()
+    db.close()
+    return rows
+
+# in-process index behind db_memberLookUp / db_findMember (see search.py)
+member_index = MemberIndex(_memberSearchRows, max_age=int(os.getenv("SEARCH_INDEX_MAX_AGE", 300)))
+
+# re-read one member into the search index after their name/email/phones change
+def reindexMember(member_id):
+    if not member_index.is_built:
+        return
+    rows = _memberSearchRows(int(member_id))
+    if rows:
+        member_index.upsert(*rows[0])
+    else:
+        member_index.remove(int(member_id))
+
 # database conn
+# [pooled: inside a request every call shares one connection that is
+# returned on teardown, so db.close() in the models is cheap. see pool.py]
 def get_db():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST", "localhost"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASS"),
-        database=os.getenv("DB_NAME")
-    )
+    return get_connection()
 
 # find a member's information
 # [only the row from the Member's table, for accompanying 
 # inforation (ie. PhoneNumber, EmergencyContact, etc...)
 # use db_memberLookup.] (owner/staff/trainer)
 def db_findMember(member_search):
+    member_search = str(member_search).strip()
     db = get_db()
     cursor = db.cursor(dictionary=True)
-    # Try to find member by ID or name
-    cursor.execute(
+    row = None
+    # an ID goes straight to the primary key. a miss stays a miss: the index
+    # also holds phone / email tokens, a mistyped ID must not check in
+    # whoever's phone number contains those digits
+    if re.fullmatch(r"[0-9]+", member_search):
+        cursor.execute("SELECT * FROM Members WHERE member_id = %s", (int(member_search),))
+        row = cursor.fetchone()
+    # otherwise take the best ranked name match from the search index
+    else:
+        ids = member_index.search(member_search, limit=1)
+        if ids:
+            cursor.execute("SELECT * FROM Members WHERE member_id = %s", (ids[0],))
+            row = cursor.fetchone()
+    cursor.close()
+    db.close()
+    return row
+
+# persist a batch of buffered check-ins in one INSERT + commit
+# [entries carry the time they were taken, NOT the time they get flushed]
+def _insertCheckins(entries):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.executemany(
         """
-        SELECT * FROM Members
-        WHERE member_id = %s OR CONCAT(first_name, ' ', last_name) LIKE %s
+        INSERT INTO Checkins (member_id, checkin_datetime)
+        VALUES (%s, %s)
         """,
-        (member_search, f"%{member_search}%")
+        [(e["member_id"], e["checkin_datetime"]) for e in entries]
     )
-    row = cursor.fetchone()
+    db.commit()
     cursor.close()
-    return row
+    db.close()
+
+# optional write-behind for check-ins (CHECKIN_WRITE_BEHIND=1 in db.env).
+# off by default: every check-in is a synchronous INSERT + COMMIT
+checkin_buffer = WriteBehindBuffer(
+    _insertCheckins,
+    max_size=int(os.getenv("CHECKIN_BUFFER_SIZE", 1000)),
+    batch_size=int(os.getenv("CHECKIN_FLUSH_BATCH", 100)),
+    interval=float(os.getenv("CHECKIN_FLUSH_INTERVAL", 1.0)),
+    put_timeout=float(os.getenv("CHECKIN_PUT_TIMEOUT", 0.5)),
+    enabled=os.getenv("CHECKIN_WRITE_BEHIND", "0") == "1",
+)
+
+# every check-in as NumPy columns for the owner's occupancy page, pulled
+# in checkin_id order off an unbuffered cursor in CHECKIN_LOAD_BATCH chunks
+def _loadCheckinColumns(after_id):
+    db = get_db()
+    cursor = db.cursor(buffered=False)
+    try:
+        cursor.execute("""
+            SELECT checkin_id, member_id,
+                   TIMESTAMPDIFF(MINUTE, '1970-01-01', checkin_datetime)
+            FROM Checkins
+            WHERE checkin_id > %s
+            ORDER BY checkin_id
+        """, (after_id,))
+        batch_size = int(os.getenv("CHECKIN_LOAD_BATCH", 100000))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield np.array(rows, dtype=np.int64)
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        db.close()
+
+checkin_columns = CheckinColumns(
+    _loadCheckinColumns, max_age=int(os.getenv("CHECKIN_COLUMNS_MAX_AGE", 60)))
 
 # log member in checkin table (owner/staff)
+# [with write-behind on this only queues the row; if the buffer is full it
+# falls back to writing synchronously. either way the row carries the app
+# server's clock, the same minute checkin_columns gets, so the occupancy
+# overlay recognises it when it comes back from the DB]
 def db_logCheckin(member):
+    entry = {
+        "checkin_id": None,
+        "member_id": member["member_id"],
+        "first_name": member.get("first_name"),
+        "last_name": member.get("last_name"),
+        "checkin_datetime": datetime.now().replace(microsecond=0),
+    }
+    if not checkin_buffer.put(entry):
+        _insertCheckins([entry])
+    checkin_columns.append(entry["member_id"], entry["checkin_datetime"])
+
+# look up many members by id in ONE query -> {member_id: row} (owner/staff)
+def db_findMembersByIds(member_ids):
+    member_ids = list(dict.fromkeys(int(m) for m in member_ids))
+    if not member_ids:
+        return {}
     db = get_db()
     cursor = db.cursor(dictionary=True)
-    cursor.execute(
+    placeholders = ", ".join(["%s"] * len(member_ids))
+    cursor.execute(f"""
+        SELECT member_id, first_name, last_name
+        FROM Members
+        WHERE member_id IN ({placeholders})
+    """, tuple(member_ids))
+    members = {row["member_id"]: row for row in cursor.fetchall()}
+    cursor.close()
+    db.close()
+    return members
+
+# occupancy analytics over the last `days` days (all time if None), off the
+# in-memory check-in columns -- only the top members' names hit the DB (owner)
+def db_checkinOccupancy(days=None, top=25):
+    since = datetime.now() - timedelta(days=days) if days else None
+    heatmap = checkin_columns.heatmap(since=since)
+    top_members, distribution, visited = checkin_columns.member_frequency(since=since, top=top)
+    names = db_findMembersByIds(m for m, _ in top_members)
+    weeks = days / 7 if days else None
+    return {
+        "heatmap": heatmap.tolist(),
+        "max_cell": int(heatmap.max()),
+        "total": int(heatmap.sum()),
+        "peaks": checkin_columns.peak_hours(heatmap=heatmap),
+        "members_visited": visited,
+        "top_members": [{
+            "member_id": m,
+            "name": " ".join(filter(None, (names.get(m, {}).get("first_name"),
+                                           names.get(m, {}).get("last_name")))) or "(deleted)",
+            "visits": v,
+            "per_week": round(v / weeks, 1) if weeks else None,
+        } for m, v in top_members],
+        "distribution": sorted(distribution.items()),
+    }
+
+# log a batch of check-ins with one multi-row INSERT and ONE commit (owner/staff)
+def db_logCheckins(member_ids):
+    if not member_ids:
+        return 0
+    now = datetime.now().replace(microsecond=0)
+    db = get_db()
+    cursor = db.cursor()
+    cursor.executemany(
         """
         INSERT INTO Checkins (member_id, checkin_datetime)
-        VALUES (%s, NOW())
+        VALUES (%s, %s)
         """,
-        (member["member_id"],)
+        [(member_id, now) for member_id in member_ids]
     )
     db.commit()
     cursor.close()
     db.close()
+    checkin_columns.extend(member_ids, now)
+    return len(member_ids)
 
 # return total member count (owner/staff)
 def db_getNumTotalMembers():
@@ -77,7 +260,7 @@ def db_getNumTotalMembers():
 def db_getNumPendingPayments():
     db = get_db()
     cursor = db.cursor(dictionary=True)
-    cursor.execute("SELECT COUNT(*) AS count FROM Payments WHERE LOWER(status) = 'pending'")
+    cursor.execute("SELECT COUNT(*) AS count FROM Payments WHERE status = 'pending'")
     row = cursor.fetchone()
     cursor.close()
     db.close()
@@ -93,11 +276,47 @@ def db_getNumActiveTrainers():
     db.close()
     return row["count"] if row and row["count"] is not None else 0
 
+# return every owner dashboard counter in ONE round trip (owner)
+# [cached for DASHBOARD_CACHE_TTL seconds, db_createMemberUser, db_deleteMember,
+# db_addPayment and db_registerTrainer drop the cached copy]
+def db_getDashboardCounts():
+    return dashboard_cache.get_or_load(DASHBOARD_KEY, _loadDashboardCounts)
+
+def _loadDashboardCounts():
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM Members) AS total_members,
+            (SELECT COUNT(*) FROM Payments WHERE status = 'pending') AS pending_payments,
+            (SELECT COUNT(*) FROM Trainers WHERE active = 1) AS active_trainers
+    """)
+    row = cursor.fetchone() or {}
+    cursor.close()
+    db.close()
+    return {
+        "total_members": row.get("total_members") or 0,
+        "pending_payments": row.get("pending_payments") or 0,
+        "active_trainers": row.get("active_trainers") or 0,
+        "total_revenue": revenue_index.total()[0],
+    }
+
+def invalidate_dashboard_counts():
+    dashboard_cache.invalidate(DASHBOARD_KEY)
+
 # returns num_shown most recent checkins (owner/staff)
-def db_showRecentCheckIns(num_shown=15):
+# [keyset paginated: pass the last checkin_id already on screen as before_id
+# to get the next page, so "Load More" never re-reads rows it already shows]
+def db_showRecentCheckIns(num_shown=15, before_id=None):
     db = get_db()
     cursor = db.cursor(dictionary=True)
-    query = f"""
+    where = ""
+    params = []
+    if before_id is not None:
+        where = "WHERE c.checkin_id < %s"
+        params.append(int(before_id))
+    params.append(int(num_shown))
+    cursor.execute(f"""
         SELECT 
             c.checkin_id,
             c.member_id,
@@ -106,21 +325,41 @@ def db_showRecentCheckIns(num_shown=15):
             c.checkin_datetime
         FROM Checkins AS c
         JOIN Members AS m ON c.member_id = m.member_id
+        {where}
         ORDER BY c.checkin_id DESC
-        LIMIT {int(num_shown)}
-    """
-    cursor.execute(query)
+        LIMIT %s
+    """, tuple(params))
     checkins = cursor.fetchall()
     cursor.close()
     db.close()
+    # check-ins still sitting in the write-behind buffer are the newest ones,
+    # they go on top of the first page (checkin_id is None until flushed)
+    if before_id is None:
+        checkins = (checkin_buffer.snapshot()[::-1] + checkins)[:int(num_shown)]
     return checkins
 
+# cursor for the page after `checkins`, or None when there isn't one
+def checkinCursor(checkins, num_shown):
+    if len(checkins) < int(num_shown):
+        return None
+    persisted = [c for c in checkins if c["checkin_id"] is not None]
+    if not persisted:
+        # a first page made only of buffered check-ins: the next page starts
+        # at the newest row in the table
+        return 2 ** 63 - 1
+    return persisted[-1]["checkin_id"]
+
 # member lookup function (owner/staff/trainer)
-def db_memberLookUp(member):
+# [matching + ranking happens in member_index, SQL only fetches the
+# details for the (at most `limit`) hits by primary key]
+def db_memberLookUp(member, limit=25):
+    member_ids = member_index.search(member, limit=limit)
+    if not member_ids:
+        return []
     db = get_db()
     cursor = db.cursor(dictionary=True)
-  
-    cursor.execute(""" 
+    placeholders = ", ".join(["%s"] * len(member_ids))
+    cursor.execute(f""" 
         SELECT m.member_id, m.first_name, m.last_name, m.email, m.birth_date,
                m.membership_start_date, p.phone_number,
                CONCAT(e.first_name, ' ', e.last_name) AS emergency_contact_name,
@@ -128,37 +367,131 @@ def db_memberLookUp(member):
         FROM Members m
         LEFT JOIN PhoneNumbers p ON m.member_id = p.member_id
         LEFT JOIN EmergencyContacts e ON m.member_id = e.member_id
-        WHERE m.member_id = %s OR m.first_name LIKE %s OR m.last_name LIKE %s 
-                               OR CONCAT(m.first_name, ' ', m.last_name) LIKE %s 
-                               OR CONCAT(m.last_name, ' ', m.first_name) LIKE %s
-    """, (member, f"%{member}%", f"%{member}%", f"%{member}%", f"%{member}%"))
+        WHERE m.member_id IN ({placeholders})
+        ORDER BY FIELD(m.member_id, {placeholders})
+    """, tuple(member_ids) * 2)
     lookup = cursor.fetchall()
     cursor.close()
     db.close()
     return lookup
 
-# returns a table of all memberships (owner/staff)
-def db_showAllMembers():
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-
-    cursor.execute("""
+# sortable columns for the member directory (?sort=...)
+MEMBER_SORTS = {
+    "id": ("m.member_id",),
+    "name": ("m.last_name", "m.first_name"),
+    "email": ("m.email",),
+    "start": ("m.membership_start_date",),
+}
+
+def _likePrefix(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _memberDirectorySQL(sort="name", order="asc", search=None):
+    columns = MEMBER_SORTS.get(sort, MEMBER_SORTS["name"])
+    direction = "DESC" if str(order).lower() == "desc" else "ASC"
+    where = ""
+    params = []
+    if search:
+        # prefix match only, so an index on the name / email columns applies
+        where = "WHERE m.first_name LIKE %s OR m.last_name LIKE %s OR m.email LIKE %s"
+        params = [_likePrefix(search)] * 3
+    sql = f"""
         SELECT m.member_id, CONCAT(m.first_name, ' ', m.last_name) AS name, 
                p.phone_number, m.email, m.birth_date, m.membership_start_date
         FROM Members m
         LEFT JOIN PhoneNumbers p ON m.member_id = p.member_id
-    """)
+        {where}
+        ORDER BY {", ".join(f"{c} {direction}" for c in columns)}, m.member_id {direction}
+    """
+    return sql, params
+
+# returns one page of the member directory (owner/staff)
+# [fetches per_page + 1 rows so the caller knows if there is a next page
+# without a separate COUNT(*)]
+def db_showAllMembers(page=1, per_page=50, sort="name", order="asc", search=None):
+    page = max(int(page), 1)
+    per_page = max(1, min(int(per_page), 200))
+    sql, params = _memberDirectorySQL(sort, order, search)
+    sql += " LIMIT %s OFFSET %s"
+    params += [per_page + 1, (page - 1) * per_page]
+
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(sql, tuple(params))
     members = cursor.fetchall()
     cursor.close()
     db.close()
-    return members
-
-# returns a table of ALL trainer client relationships (owner)
-def db_showTrainerClientRel():
+    has_next = len(members) > per_page
+    return members[:per_page], has_next
+
+# yields EVERY member row as MySQL sends it (unbuffered cursor), for the
+# streamed directory. memory stays flat no matter how many members there
+# are, but the connection is busy until the generator is exhausted/closed
+def db_streamAllMembers(sort="name", order="asc", search=None, batch_size=500):
+    sql, params = _memberDirectorySQL(sort, order, search)
     db = get_db()
-    cursor = db.cursor(dictionary=True)
-    cursor.execute("""
+    cursor = db.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass  # unread rows (client went away); the pool drops the conn
+        db.close()
+
+RELATIONSHIP_SORTS = {
+    "start": ("tc.client_start_date",),
+    "end": ("tc.client_end_date",),
+    "trainer": ("s.last_name", "s.first_name"),
+    "client": ("m.last_name", "m.first_name"),
+}
+RELATIONSHIP_STATUSES = ("all", "active", "ended")
+
+# returns one page of trainer client relationships (owner), filtered in SQL
+#   trainer_id     only this trainer's clients
+#   client         member_id, or a first / last name prefix
+#   status         all | active (no end date) | ended
+#   date_from/to   relationships that overlap this range (yyyy-mm-dd)
+# [same per_page + 1 trick as db_showAllMembers for has_next]
+def db_showTrainerClientRel(trainer_id=None, client=None, status="all", date_from=None,
+                            date_to=None, page=1, per_page=50, sort="start", order="desc"):
+    page = max(int(page), 1)
+    per_page = max(1, min(int(per_page), 200))
+    columns = RELATIONSHIP_SORTS.get(sort, RELATIONSHIP_SORTS["start"])
+    direction = "DESC" if str(order).lower() == "desc" else "ASC"
+
+    where, params = [], []
+    if trainer_id:
+        where.append("tc.trainer_id = %s")
+        params.append(int(trainer_id))
+    if client:
+        if client.isdigit():
+            where.append("tc.member_id = %s")
+            params.append(int(client))
+        else:
+            # prefix only, so idx_members_last_first / idx_members_first apply
+            where.append("(m.first_name LIKE %s OR m.last_name LIKE %s)")
+            params += [_likePrefix(client)] * 2
+    if status == "active":
+        where.append("tc.client_end_date IS NULL")
+    elif status == "ended":
+        where.append("tc.client_end_date IS NOT NULL")
+    if date_from:
+        where.append("(tc.client_end_date IS NULL OR tc.client_end_date >= %s)")
+        params.append(date_from)
+    if date_to:
+        where.append("tc.client_start_date <= %s")
+        params.append(date_to)
+
+    sql = f"""
         SELECT
+            tc.trainer_id, tc.member_id,
             CONCAT(s.first_name, ' ', s.last_name) AS trainer,
             CONCAT(m.first_name, ' ', m.last_name) AS client,
             tc.notes, tc.client_start_date, tc.client_end_date
@@ -166,20 +499,37 @@ def db_showTrainerClientRel():
             TrainerClients AS tc
             LEFT JOIN Staff AS s ON tc.trainer_id = s.staff_id
             LEFT JOIN Members AS m ON tc.member_id = m.member_id
-    """)
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {", ".join(f"{c} {direction}" for c in columns)},
+                 tc.trainer_id {direction}, tc.member_id {direction}
+        LIMIT %s OFFSET %s
+    """
+    params += [per_page + 1, (page - 1) * per_page]
+
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(sql, tuple(params))
     trainerClients = cursor.fetchall()
     cursor.close()
     db.close()
-    return trainerClients
+    has_next = len(trainerClients) > per_page
+    return trainerClients[:per_page], has_next
+
+# per trainer client rosters, dropped by db_assignTrainer / db_deleteMember
+roster_cache = TTLCache(ttl=int(os.getenv("ROSTER_CACHE_TTL", 300)))
 
 # returns a table of clients from a SPECIFIC trainer (trainer)
 def db_showTrainerClients(trainerID):
     if trainerID is None:
         return []
+    return roster_cache.get_or_load(int(trainerID), lambda: _loadTrainerClients(trainerID))
+
+def _loadTrainerClients(trainerID):
     db = get_db()
     cursor = db.cursor(dictionary=True)
     cursor.execute("""
         SELECT
+            tc.member_id,
             CONCAT(m.first_name, ' ', m.last_name) AS client,
             tc.notes, tc.client_start_date, tc.client_end_date
         FROM
@@ -187,12 +537,50 @@ def db_showTrainerClients(trainerID):
             LEFT JOIN Members AS m ON tc.member_id = m.member_id
         WHERE 
             tc.trainer_id = %s
-    """, (trainerID))
+    """, (trainerID,))
     trainerClients = cursor.fetchall()
     cursor.close()
     db.close()
     return trainerClients
 
+# staff_id of the Staff row behind a user account (trainer/staff login).
+# users.staff_id is the real link (migration 003); accounts that predate it
+# fall back to an EXACT, unambiguous name match
+def db_getUserStaffId(user):
+    if user.get("staff_id"):
+        return user["staff_id"]
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT staff_id FROM Staff
+        WHERE first_name = %s AND last_name = %s
+        LIMIT 2
+    """, (user["first_name"], user["last_name"]))
+    rows = cursor.fetchall()
+    cursor.close()
+    db.close()
+    return rows[0][0] if len(rows) == 1 else None
+
+# point a staff / trainer login at its Staff row (sets users.staff_id, owner).
+# returns False when there's no staff or trainer account with that username
+def db_linkStaffAccount(username, staff_id):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT user_id FROM users
+        WHERE username = %s AND role_id IN (2, 4)
+    """, (username,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.close()
+        db.close()
+        return False
+    cursor.execute("UPDATE users SET staff_id = %s WHERE user_id = %s", (staff_id, row[0]))
+    db.commit()
+    cursor.close()
+    db.close()
+    return True
+
 def db_getMemberPhone(memberID):
     if memberID is None:
         return []
@@ -243,6 +631,8 @@ def db_createMemberUser(fname, lname, bd, email, sex, username, pw):
     db.commit()
     cursor.close()
     db.close()
+    invalidate_dashboard_counts()
+    member_index.upsert(member_id, fname, lname, email)
     return member_id, user_id
 
 # update a member's information (owner/staff/member(self))
@@ -266,6 +656,7 @@ def db_updateMemberEmail(member_id, new_email):
     db.commit()
     cursor.close()
     db.close()
+    reindexMember(member_id)
 
 def db_addMemberPhone(member_id, phone_number, phone_type):
     db = get_db()
@@ -279,6 +670,7 @@ def db_addMemberPhone(member_id, phone_number, phone_type):
     db.commit()
     cursor.close()
     db.close()
+    reindexMember(member_id)
 
 def db_updateMemberPhone(member_id, phone_number_id, new_phone_number, new_type):
     db = get_db()
@@ -294,14 +686,19 @@ def db_updateMemberPhone(member_id, phone_number_id, new_phone_number, new_type)
     db.commit()
     cursor.close()
     db.close()
+    reindexMember(member_id)
 
 def db_deletePhoneNum(phoneID):
     db = get_db()
     cursor = db.cursor()
+    cursor.execute("SELECT member_id FROM PhoneNumbers WHERE phone_number_id = %s", (phoneID,))
+    row = cursor.fetchone()
     cursor.execute("DELETE FROM PhoneNumbers WHERE phone_number_id = %s", (phoneID,))
     db.commit()
     cursor.close()
     db.close()
+    if row:
+        reindexMember(row[0])
 
 def db_addMemberEmergencyContact(member_id, fname, lname, relationship, phone, email):
     db = get_db()
@@ -358,6 +755,17 @@ def db_deleteMember(member_id):
     cursor.execute("DELETE FROM Checkins WHERE member_id = %s", (member_id,))
     cursor.execute("DELETE FROM PhoneNumbers WHERE member_id = %s", (member_id,))
     cursor.execute("DELETE FROM EmergencyContacts WHERE member_id = %s", (member_id,))
+    # take their payments back out of the revenue rollup before they go
+    cursor.execute("""
+        SELECT payment_date, status, COALESCE(type, '') AS type,
+               SUM(amount) AS total, COUNT(*) AS payments
+        FROM Payments
+        WHERE member_id = %s
+        GROUP BY payment_date, status, COALESCE(type, '')
+    """, (member_id,))
+    for group in cursor.fetchall():
+        _bumpRevenue(cursor, group["payment_date"], group["status"], group["type"],
+                     -group["total"], -group["payments"])
     cursor.execute("DELETE FROM Payments WHERE member_id = %s", (member_id,))
     cursor.execute("DELETE FROM TrainerClients WHERE member_id = %s OR trainer_id = %s", (member_id, member_id))
 
@@ -367,10 +775,52 @@ def db_deleteMember(member_id):
     db.commit()
     cursor.close()
     db.close()
+    invalidate_dashboard_counts()
+    revenue_index.invalidate()
+    checkin_columns.remove(member_id)
+    member_index.remove(int(member_id))
+    roster_cache.clear()
     return True
 
+# ---------- daily revenue rollup (RevenueDaily) ----------
+# one row per (day, status, type), bumped in the same transaction as the
+# payment write. revenue_index (revenue.py) turns it into prefix sums so
+# range totals never touch Payments
+def _bumpRevenue(cursor, day, status, payment_type, amount, payments):
+    cursor.execute("""
+        INSERT INTO RevenueDaily (day, status, type, total, payments)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total = total + VALUES(total),
+            payments = payments + VALUES(payments)
+    """, (day, status, payment_type or "", amount, payments))
+
+# the rollup recomputed from Payments (migration 006 backfill, seed.py)
+REVENUE_ROLLUP_SQL = """
+    INSERT INTO RevenueDaily (day, status, type, total, payments)
+    SELECT payment_date, status, COALESCE(type, ''), SUM(amount), COUNT(*)
+    FROM Payments
+    GROUP BY payment_date, status, COALESCE(type, '')
+"""
+
+def _loadRevenueDaily():
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT day, status, type, total, payments
+        FROM RevenueDaily
+        WHERE payments <> 0
+    """)
+    rows = cursor.fetchall()
+    cursor.close()
+    db.close()
+    return rows
+
+revenue_index = RevenueIndex(_loadRevenueDaily, ttl=int(os.getenv("REVENUE_INDEX_TTL", 60)))
+
 # add a payment for a member (owner/staff/member)
 def db_addPayment(member_id, amount, status="pending", payment_type="membership"):
+    status = normalizePaymentStatus(status) or "pending"
     db = get_db()
     cursor = db.cursor()
 
@@ -378,10 +828,54 @@ def db_addPayment(member_id, amount, status="pending", payment_type="membership"
         INSERT INTO Payments (member_id, amount, payment_date, status, type)
         VALUES (%s, %s, CURDATE(), %s, %s)
     """, (member_id, amount, status, payment_type))
+    cursor.execute("SELECT CURDATE()")
+    _bumpRevenue(cursor, cursor.fetchone()[0], status, payment_type, amount, 1)
 
     db.commit()
     cursor.close()
     db.close()
+    invalidate_dashboard_counts()
+    revenue_index.invalidate()
+
+# move a payment to another status, ie. pending -> complete (owner/staff)
+def db_updatePaymentStatus(payment_id, status):
+    status = normalizePaymentStatus(status)
+    if status is None:
+        return False
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+
+    cursor.execute("""
+        SELECT payment_date, status, type, amount
+        FROM Payments
+        WHERE payment_id = %s
+        FOR UPDATE
+    """, (payment_id,))
+    payment = cursor.fetchone()
+    if payment is None or payment["status"] == status:
+        db.rollback()
+        cursor.close()
+        db.close()
+        return payment is not None
+
+    cursor.execute("UPDATE Payments SET status = %s WHERE payment_id = %s", (status, payment_id))
+    _bumpRevenue(cursor, payment["payment_date"], payment["status"], payment["type"],
+                 -payment["amount"], -1)
+    _bumpRevenue(cursor, payment["payment_date"], status, payment["type"], payment["amount"], 1)
+
+    db.commit()
+    cursor.close()
+    db.close()
+    invalidate_dashboard_counts()
+    revenue_index.invalidate()
+    return True
+
+# revenue between two dates (inclusive), from the prefix sums (owner)
+def db_revenueBetween(date_from=None, date_to=None, status="complete", payment_type=None):
+    return revenue_index.total(date_from, date_to, status, payment_type)[0]
+
+def db_revenueSeries(date_from, date_to, bucket="day", status="complete", payment_type=None):
+    return revenue_index.series(date_from, date_to, bucket, status, payment_type)
 
 # register staff / trainer (owner)
 def db_registerStaff(ssn, fname, lname, emp_date, birth_date, address,
@@ -430,6 +924,7 @@ def db_registerTrainer(staff_id, speciality, active=1):
     db.commit()
     cursor.close()
     db.close()
+    invalidate_dashboard_counts()
 
 def db_getAllTrainers():
     db = get_db()
@@ -464,10 +959,67 @@ def db_assignTrainer(trainer_id, member_id, notes=None):
     db.commit()
     cursor.close()
     db.close()
+    roster_cache.invalidate(int(trainer_id))
+
+# ---------- per member exercise rollups (MemberExerciseStats) ----------
+# one row per member with running totals, kept current in the same
+# transaction as every exercise write so stat cards are a PK lookup.
+# verify / rebuild against the raw tables with `python -m website.rollups`
+EXERCISE_ROLLUP_COLUMNS = ("workouts", "rpe_sum", "rpe_count", "max_weight",
+                           "run_distance_sum", "run_count", "last_workout_date")
+
+# the rollup recomputed from raw rows, {where} filters Exercises (e)
+EXERCISE_ROLLUP_SQL = """
+    SELECT e.member_id,
+           COUNT(*) AS workouts,
+           COALESCE(SUM(e.rpe), 0) AS rpe_sum,
+           COUNT(e.rpe) AS rpe_count,
+           MAX(se.exercise_weight) AS max_weight,
+           COALESCE(SUM(r.distance), 0) AS run_distance_sum,
+           COUNT(r.distance) AS run_count,
+           MAX(e.exercise_date) AS last_workout_date
+    FROM Exercises e
+    LEFT JOIN Strength_Exercises se ON se.exercise_id = e.exercise_id
+    LEFT JOIN Cardio_Exercises c ON c.exercise_id = e.exercise_id
+    LEFT JOIN Runs r ON r.cardio_id = c.cardio_id
+    {where}
+    GROUP BY e.member_id
+"""
+
+# recompute one member's rollup from raw rows (only needed when a delete /
+# date change may have removed their max weight or latest workout)
+def _refreshExerciseRollup(cursor, member_id):
+    cursor.execute("DELETE FROM MemberExerciseStats WHERE member_id = %s", (member_id,))
+    cursor.execute(f"""
+        INSERT INTO MemberExerciseStats (member_id, {", ".join(EXERCISE_ROLLUP_COLUMNS)})
+        {EXERCISE_ROLLUP_SQL.format(where="WHERE e.member_id = %s")}
+    """, (member_id,))
+
+# an exercise's rollup inputs + its member's current rollup, rows locked
+# until the caller commits so concurrent writes can't interleave
+def _exerciseRollupInputs(cursor, exercise_id):
+    cursor.execute("""
+        SELECT e.member_id, e.rpe, e.exercise_date, se.exercise_weight, r.distance,
+               s.member_id IS NOT NULL AS has_rollup, s.max_weight, s.last_workout_date
+        FROM Exercises e
+        LEFT JOIN Strength_Exercises se ON se.exercise_id = e.exercise_id
+        LEFT JOIN Cardio_Exercises c ON c.exercise_id = e.exercise_id
+        LEFT JOIN Runs r ON r.cardio_id = c.cardio_id
+        LEFT JOIN MemberExerciseStats s ON s.member_id = e.member_id
+        WHERE e.exercise_id = %s
+        FOR UPDATE
+    """, (exercise_id,))
+    return cursor.fetchone()
+
+def _asDate(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if isinstance(value, str) else value
 
 # log an exercise for a member (owner/trainer/member)
+#   strength_data  (strength_id, exercise_weight, weight_unit, num_sets, num_repetitions, notes)
+#   cardio_data    (avg_hr, time_taken)
+#   run_data       (distance_unit, distance, laps), needs cardio_data
 def db_logExercise(member_id, name, rpe, date,
-                   strength_data=None, cardio_data=None):
+                   strength_data=None, cardio_data=None, run_data=None):
     db = get_db()
     cursor = db.cursor()
 
@@ -477,6 +1029,7 @@ def db_logExercise(member_id, name, rpe, date,
     """, (member_id, name, rpe, date))
 
     exercise_id = cursor.lastrowid
+    weight = distance = None
 
     if strength_data:
         cursor.execute("""
@@ -485,6 +1038,7 @@ def db_logExercise(member_id, name, rpe, date,
              num_sets, num_repetitions, notes)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """, (exercise_id, *strength_data))
+        weight = strength_data[1]
 
     if cardio_data:
         cursor.execute("""
@@ -492,16 +1046,44 @@ def db_logExercise(member_id, name, rpe, date,
             (exercise_id, avg_hr, time_taken)
             VALUES (%s, %s, %s)
         """, (exercise_id, *cardio_data))
+        if run_data:
+            cursor.execute("""
+                INSERT INTO Runs (cardio_id, distance_unit, distance, laps)
+                VALUES (%s, %s, %s, %s)
+            """, (cursor.lastrowid, *run_data))
+            distance = run_data[1]
+
+    # rollup: O(1) upsert, GREATEST() with NULL is NULL hence the COALESCEs
+    cursor.execute("""
+        INSERT INTO MemberExerciseStats
+            (member_id, workouts, rpe_sum, rpe_count, max_weight,
+             run_distance_sum, run_count, last_workout_date)
+        VALUES (%s, 1, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            workouts = workouts + 1,
+            rpe_sum = rpe_sum + VALUES(rpe_sum),
+            rpe_count = rpe_count + VALUES(rpe_count),
+            max_weight = GREATEST(COALESCE(max_weight, VALUES(max_weight)),
+                                  COALESCE(VALUES(max_weight), max_weight)),
+            run_distance_sum = run_distance_sum + VALUES(run_distance_sum),
+            run_count = run_count + VALUES(run_count),
+            last_workout_date = GREATEST(COALESCE(last_workout_date, VALUES(last_workout_date)),
+                                         VALUES(last_workout_date))
+    """, (member_id, rpe or 0, int(rpe is not None), weight,
+          distance or 0, int(distance is not None), date))
 
     db.commit()
     cursor.close()
     db.close()
+    return exercise_id
 
 # modify an exercise record (owner/trainer/member)
 def db_modifyExercise(exercise_id, rpe=None, date=None):
+    date = date or None     # blank form field = leave the date alone
     db = get_db()
-    cursor = db.cursor()
+    cursor = db.cursor(dictionary=True)
 
+    old = _exerciseRollupInputs(cursor, exercise_id)
     cursor.execute("""
         UPDATE Exercises
         SET rpe = COALESCE(%s, rpe),
@@ -509,6 +1091,24 @@ def db_modifyExercise(exercise_id, rpe=None, date=None):
         WHERE exercise_id = %s
     """, (rpe, date, exercise_id))
 
+    if old is not None:
+        date = _asDate(date)
+        moved_back = (date is not None and date < old["exercise_date"]
+                      and old["exercise_date"] == old["last_workout_date"])
+        if not old["has_rollup"] or moved_back:
+            # may no longer be the latest workout, recount this member
+            _refreshExerciseRollup(cursor, old["member_id"])
+        elif rpe is not None or date is not None:
+            cursor.execute("""
+                UPDATE MemberExerciseStats
+                SET rpe_sum = rpe_sum + %s,
+                    rpe_count = rpe_count + %s,
+                    last_workout_date = GREATEST(last_workout_date, COALESCE(%s, last_workout_date))
+                WHERE member_id = %s
+            """, ((rpe - (old["rpe"] or 0)) if rpe is not None else 0,
+                  int(rpe is not None and old["rpe"] is None),
+                  date, old["member_id"]))
+
     db.commit()
     cursor.close()
     db.close()
@@ -516,14 +1116,56 @@ def db_modifyExercise(exercise_id, rpe=None, date=None):
 # delete an exercise (owner/trainer/member)
 def db_deleteExercise(exercise_id):
     db = get_db()
-    cursor = db.cursor()
+    cursor = db.cursor(dictionary=True)
 
+    old = _exerciseRollupInputs(cursor, exercise_id)
     cursor.execute("DELETE FROM Exercises WHERE exercise_id = %s", (exercise_id,))
 
+    if old is not None:
+        was_max = (old["exercise_weight"] is not None
+                   and old["exercise_weight"] >= (old["max_weight"] or 0))
+        was_latest = old["exercise_date"] >= (old["last_workout_date"] or old["exercise_date"])
+        if not old["has_rollup"] or was_max or was_latest:
+            _refreshExerciseRollup(cursor, old["member_id"])
+        else:
+            cursor.execute("""
+                UPDATE MemberExerciseStats
+                SET workouts = workouts - 1,
+                    rpe_sum = rpe_sum - %s,
+                    rpe_count = rpe_count - %s,
+                    run_distance_sum = run_distance_sum - %s,
+                    run_count = run_count - %s
+                WHERE member_id = %s
+            """, (old["rpe"] or 0, int(old["rpe"] is not None),
+                  old["distance"] or 0, int(old["distance"] is not None), old["member_id"]))
+
     db.commit()
     cursor.close()
     db.close()
 
+# exercise stat cards for some members, {member_id: stats} from the rollup
+# table (one PK lookup per member, no matter how much history they have)
+def db_getExerciseRollups(member_ids):
+    member_ids = list(member_ids)
+    if not member_ids:
+        return {}
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT member_id, workouts, max_weight, last_workout_date,
+               rpe_sum / NULLIF(rpe_count, 0) AS avg_rpe,
+               run_distance_sum / NULLIF(run_count, 0) AS avg_run_distance
+        FROM MemberExerciseStats
+        WHERE member_id IN ({", ".join(["%s"] * len(member_ids))})
+    """, tuple(member_ids))
+    rollups = {row["member_id"]: row for row in cursor.fetchall()}
+    cursor.close()
+    db.close()
+    return rollups
+
+def db_getExerciseRollup(member_id):
+    return db_getExerciseRollups([member_id]).get(int(member_id))
+
 # get exercises for a specific member (owner/trainer/member)
 def db_getExercise(member_id):
     db = get_db()
@@ -541,61 +1183,148 @@ def db_getExercise(member_id):
     db.close()
     return exercises
 
-# aggregate total payments / revenue (owner/staff/member)
-def db_aggregatePayments(member=False, member_id=None):
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
+# every exercise of the given members with its strength / run details
+# joined in, one query for any number of members (see analytics.py).
+# plain tuples, sorted by member then date:
+#   (member_id, exercise_date, exercise_name, rpe, exercise_weight, weight_unit,
+#    num_sets, num_repetitions, time_taken, distance, distance_unit)
+def db_getExerciseHistory(member_ids, since=None):
+    member_ids = list(member_ids)
+    if not member_ids:
+        return []
+    sql = f"""
+        SELECT e.member_id, e.exercise_date, e.exercise_name, e.rpe,
+               se.exercise_weight, se.weight_unit, se.num_sets, se.num_repetitions,
+               c.time_taken, r.distance, r.distance_unit
+        FROM Exercises e
+        LEFT JOIN Strength_Exercises se ON se.exercise_id = e.exercise_id
+        LEFT JOIN Cardio_Exercises c ON c.exercise_id = e.exercise_id
+        LEFT JOIN Runs r ON r.cardio_id = c.cardio_id
+        WHERE e.member_id IN ({", ".join(["%s"] * len(member_ids))})
+    """
+    params = list(member_ids)
+    if since:
+        sql += " AND e.exercise_date >= %s"
+        params.append(since)
+    sql += " ORDER BY e.member_id, e.exercise_date, e.exercise_id"
 
-    if member == False:
-        cursor.execute("""
-            SELECT SUM(amount) AS total_revenue
-            FROM Payments
-            WHERE LOWER(status) = 'Complete' OR LOWER(status) = 'Paid'
-        """)
-    else:
-        cursor.execute("""
-            SELECT SUM(amount) AS total_revenue
-            FROM Payments
-            WHERE LOWER(status) = 'completed'
-            AND member_id = %s
-        """, (member_id))
-    row = cursor.fetchone()
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(sql, tuple(params))
+    rows = cursor.fetchall()
     cursor.close()
     db.close()
-    return row["total_revenue"] or 0
+    return rows
+
+# aggregate total payments / revenue (owner/staff/member)
+# [gym wide totals come from the revenue prefix sums, not Payments]
+def db_aggregatePayments(member=False, member_id=None):
+    if member == False:
+        return revenue_index.total()[0]
 
-# aggregate average RPE (owner/trainer/member)
-def db_aggregateRPE(member_id):
     db = get_db()
     cursor = db.cursor(dictionary=True)
-
     cursor.execute("""
-        SELECT AVG(rpe) AS avg_rpe
-        FROM Exercises
-        WHERE member_id = %s
+        SELECT SUM(amount) AS total_revenue
+        FROM Payments
+        WHERE status = 'complete'
+        AND member_id = %s
     """, (member_id,))
-
     row = cursor.fetchone()
     cursor.close()
     db.close()
-    return row["avg_rpe"] or 0
+    return row["total_revenue"] or 0
+
+# aggregate average RPE (owner/trainer/member)
+def db_aggregateRPE(member_id):
+    rollup = db_getExerciseRollup(member_id)
+    return (rollup and rollup["avg_rpe"]) or 0
 
 # aggregate max weight lifted by a member (owner/traiiner/member)
 def db_aggregateMaxWeight(member_id):
+    rollup = db_getExerciseRollup(member_id)
+    return (rollup and rollup["max_weight"]) or 0
+
+# the columns _paymentSearchSQL selects, in order (export headers)
+PAYMENT_COLUMNS = ("payment_id", "member_id", "member_name", "amount",
+                   "payment_date", "status", "type")
+
+# payment search shared by the owner payments page and its export
+# (member id or name, date range, canonical status -- all optional)
+def _paymentSearchSQL(member_query=None, date_from=None, date_to=None, status=None):
+    where = []
+    params = []
+    if member_query:
+        # id, or first / last name prefixes ("jo", "jo smi") so the name
+        # indexes apply instead of a %substring% scan of every member
+        parts = member_query.split()
+        if member_query.isdigit():
+            where.append("p.member_id = %s")
+            params.append(int(member_query))
+        elif len(parts) >= 2:
+            where.append("(m.first_name LIKE %s AND m.last_name LIKE %s)")
+            params += [_likePrefix(parts[0]), _likePrefix(" ".join(parts[1:]))]
+        else:
+            where.append("(m.first_name LIKE %s OR m.last_name LIKE %s)")
+            params += [_likePrefix(member_query)] * 2
+    if date_from:
+        where.append("p.payment_date >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("p.payment_date <= %s")
+        params.append(date_to)
+    if status:
+        where.append("p.status = %s")
+        params.append(status)
+
+    sql = """
+        SELECT 
+            p.payment_id,
+            p.member_id,
+            CONCAT(m.first_name, ' ', m.last_name) AS member_name,
+            p.amount,
+            p.payment_date,
+            p.status,
+            p.type
+        FROM Payments AS p
+        JOIN Members AS m ON p.member_id = m.member_id
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY p.payment_date DESC, p.payment_id DESC"
+    return sql, params
+
+# search payments (owner)
+def db_searchPayments(member_query=None, date_from=None, date_to=None, status=None):
+    sql, params = _paymentSearchSQL(member_query, date_from, date_to, status)
     db = get_db()
     cursor = db.cursor(dictionary=True)
-
-    cursor.execute("""
-        SELECT MAX(exercise_weight) AS max_weight
-        FROM Strength_Exercises se
-        JOIN Exercises e ON se.exercise_id = e.exercise_id
-        WHERE e.member_id = %s
-    """, (member_id,))
-
-    row = cursor.fetchone()
+    cursor.execute(sql, tuple(params))
+    payments = cursor.fetchall()
     cursor.close()
     db.close()
-    return row["max_weight"] or 0
+    return payments
+
+# same search as db_searchPayments, but yields lists of at most batch_size
+# rows off an unbuffered (server-side) cursor, for exports (owner)
+def db_streamPayments(member_query=None, date_from=None, date_to=None, status=None,
+                      batch_size=1000):
+    sql, params = _paymentSearchSQL(member_query, date_from, date_to, status)
+    db = get_db()
+    cursor = db.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass  # unread rows (client went away); the pool drops the conn
+        db.close()
 
 # load pending payments
 def db_loadPendingPayments():
@@ -612,7 +1341,7 @@ def db_loadPendingPayments():
             p.type
         FROM Payments AS p
         JOIN Members AS m ON p.member_id = m.member_id
-        WHERE LOWER(p.status) = 'pending'
+        WHERE p.status = 'pending'
         ORDER BY p.payment_date DESC
     """)
     pending_payments = cursor.fetchall()
@@ -622,23 +1351,69 @@ def db_loadPendingPayments():
 
 # aggregate average run distance (owner/trainer/member)
 def db_aggregateAvgRunDist(member_id):
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-
-    cursor.execute("""
-        SELECT AVG(r.distance) AS avg_distance
-        FROM Runs r
-        JOIN Cardio_Exercises c ON r.cardio_id = c.cardio_id
-        JOIN Exercises e ON c.exercise_id = e.exercise_id
-        WHERE e.member_id = %s
-    """, (member_id,))
+    rollup = db_getExerciseRollup(member_id)
+    return (rollup and rollup["avg_run_distance"]) or 0
 
-    row = cursor.fetchone()
+# persist a batch of captured errors (see errorlog.py), one INSERT + commit
+def _insertErrorLogs(records):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.executemany("""
+        INSERT INTO ErrorLogs
+            (logged_at, level, logger, route, path, method, username,
+             exception_type, message, traceback)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(r["logged_at"], r["level"], r["logger"], r["route"], r["path"], r["method"],
+           r["username"], r["exception_type"], r["message"], r["traceback"])
+          for r in records])
+    db.commit()
     cursor.close()
     db.close()
-    return row["avg_distance"] or 0
+
+# captured errors waiting to be written to ErrorLogs. put() never waits:
+# a request that is already failing must not block on the error log
+error_buffer = WriteBehindBuffer(
+    _insertErrorLogs,
+    max_size=int(os.getenv("ERROR_BUFFER_SIZE", 1000)),
+    batch_size=int(os.getenv("ERROR_FLUSH_BATCH", 50)),
+    interval=float(os.getenv("ERROR_FLUSH_INTERVAL", 2.0)),
+    put_timeout=0,
+)
 
 # get error logs (owner/staff)
-# TODO: set up error logging 
-def db_getErrorLog():
-    return
+# [newest first, one page at a time, optionally filtered by time range,
+# route (flask endpoint) and exception type. returns (rows, has_next)]
+def db_getErrorLog(page=1, per_page=50, since=None, until=None, route=None, exception_type=None):
+    page = max(int(page), 1)
+    where = []
+    params = []
+    if since:
+        where.append("logged_at >= %s")
+        params.append(since)
+    if until:
+        where.append("logged_at <= %s")
+        params.append(until)
+    if route:
+        where.append("route = %s")
+        params.append(route)
+    if exception_type:
+        where.append("exception_type = %s")
+        params.append(exception_type)
+
+    sql = """
+        SELECT error_id, logged_at, level, logger, route, path, method, username,
+               exception_type, message, traceback
+        FROM ErrorLogs
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY logged_at DESC, error_id DESC LIMIT %s OFFSET %s"
+    params += [per_page + 1, (page - 1) * per_page]
+
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(sql, tuple(params))
+    errors = cursor.fetchall()
+    cursor.close()
+    db.close()
+    return errors[:per_page], len(errors) > per_page
@@ -0,0 +1,190 @@
+# ======================================================================= #
+#                       GYMMAN: CHECK-IN ANALYTICS                        #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (occupancy.py) keeps every check-in in memory as two NumPy    #
+# columns (member_id, minutes since 1970-01-01 in gym local time, both    #
+# int32 -- 8 bytes a check-in, ~240MB for 30M) so the owner's occupancy   #
+# page is a few vectorized passes instead of SQL GROUP BYs:               #
+#                                                                         #
+#   - hour-of-week heatmap    bincount of ((minute // 60) + 72) % 168     #
+#     (1970-01-01 was a Thursday, +72h makes Monday 00:00 bucket 0)       #
+#   - peak hours              top cells of that heatmap                   #
+#   - visits per member       bincount of member_id                       #
+#                                                                         #
+# The columns are loaded on first use. db_logCheckin / db_logCheckins     #
+# append to a small overlay straight away (so write-behind rows count     #
+# too), and every CHECKIN_COLUMNS_MAX_AGE seconds the rows other workers  #
+# wrote are pulled in by checkin_id, folding our own overlay rows away as #
+# they show up from the DB. Overlay rows more than a minute older than    #
+# the newest DB row are dropped even if they never matched, so drift      #
+# can't pile up.                                                          #
+# ======================================================================= #
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+HOURS_PER_WEEK = 168
+_MONDAY_OFFSET = 72     # hours from Thursday 00:00 to Monday 00:00 bucket
+
+
+def to_minute(when):
+    return int((when - EPOCH).total_seconds() // 60)
+
+
+class CheckinColumns:
+    def __init__(self, loader, max_age=60):
+        # loader(after_id) -> iterable of int64 arrays shaped (n, 3):
+        # checkin_id, member_id, minute -- rows with checkin_id > after_id
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._member = np.empty(0, dtype=np.int32)
+        self._minute = np.empty(0, dtype=np.int32)
+        self._last_id = 0
+        self._max_minute = 0    # newest minute pulled from the DB
+        self._overlay = []      # [(member_id, minute)] not seen in the DB yet
+        self._built_at = None
+        self._refreshed_at = None
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    # pull new rows on the next read instead of waiting out max_age
+    def invalidate(self):
+        with self._lock:
+            if self._built_at is not None:
+                self._refreshed_at = float("-inf")
+
+    # ---------- loading ----------
+    def _pull(self):
+        members, minutes, last_id = [], [], self._last_id
+        for chunk in self._loader(self._last_id):
+            if not len(chunk):
+                continue
+            last_id = max(last_id, int(chunk[:, 0].max()))
+            members.append(chunk[:, 1].astype(np.int32))
+            minutes.append(chunk[:, 2].astype(np.int32))
+        return members, minutes, last_id
+
+    def _refresh(self):
+        started = time.monotonic()
+        members, minutes, last_id = self._pull()
+        if members:
+            new_member = np.concatenate(members)
+            new_minute = np.concatenate(minutes)
+            # our own overlay rows that have now landed in the DB
+            landed = Counter(zip(new_member.tolist(), new_minute.tolist())) if self._overlay else None
+            if landed:
+                overlay = []
+                for pair in self._overlay:
+                    if landed[pair]:
+                        landed[pair] -= 1
+                    else:
+                        overlay.append(pair)
+                self._overlay = overlay
+            self._member = np.concatenate([self._member, new_member])
+            self._minute = np.concatenate([self._minute, new_minute])
+            self._last_id = last_id
+            # anything a minute older than the newest row the DB has should
+            # have landed by now; if it didn't match (clock drift, an edited
+            # row) stop counting it rather than keep it forever
+            self._max_minute = max(self._max_minute, int(new_minute.max()))
+            self._overlay = [pair for pair in self._overlay
+                             if pair[1] >= self._max_minute - 1]
+        now = time.monotonic()
+        if self._built_at is None:
+            self._built_at = now
+            log.info("check-in columns loaded: %d rows in %.2fs",
+                     len(self._member), now - started)
+        self._refreshed_at = now
+
+    def _columns(self):
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._refreshed_at > self.max_age:
+                self._refresh()
+            member, minute = self._member, self._minute
+            if self._overlay:
+                extra = np.array(self._overlay, dtype=np.int32)
+                member = np.concatenate([member, extra[:, 0]])
+                minute = np.concatenate([minute, extra[:, 1]])
+            return member, minute
+
+    # ---------- writes ----------
+    def append(self, member_id, when):
+        self.extend([member_id], when)
+
+    def extend(self, member_ids, when):
+        with self._lock:
+            if self._built_at is None:
+                return      # not loaded yet, the first read gets these from the DB
+            minute = to_minute(when)
+            self._overlay.extend((int(m), minute) for m in member_ids)
+
+    # a deleted member's check-ins are gone from the DB, drop them here too
+    def remove(self, member_id):
+        with self._lock:
+            keep = self._member != int(member_id)
+            self._member = self._member[keep]
+            self._minute = self._minute[keep]
+            self._overlay = [pair for pair in self._overlay if pair[0] != int(member_id)]
+
+    # ---------- queries ----------
+    def _window(self, since=None, until=None):
+        member, minute = self._columns()
+        if since is None and until is None:
+            return member, minute
+        mask = np.ones(len(minute), dtype=bool)
+        if since is not None:
+            mask &= minute >= to_minute(since)
+        if until is not None:
+            mask &= minute < to_minute(until)
+        return member[mask], minute[mask]
+
+    # 7 x 24 check-in counts, rows Monday..Sunday, columns hour of day
+    def heatmap(self, since=None, until=None):
+        _, minute = self._window(since, until)
+        hour_of_week = (minute // 60 + _MONDAY_OFFSET) % HOURS_PER_WEEK
+        return np.bincount(hour_of_week, minlength=HOURS_PER_WEEK).reshape(7, 24)
+
+    # the `top` busiest (weekday, hour, check-ins), busiest first
+    def peak_hours(self, since=None, until=None, top=5, heatmap=None):
+        counts = (self.heatmap(since, until) if heatmap is None else heatmap).ravel()
+        top = min(top, len(counts))
+        best = np.argpartition(-counts, top - 1)[:top]
+        best = best[np.argsort(-counts[best], kind="stable")]
+        return [(int(i) // 24, int(i) % 24, int(counts[i])) for i in best if counts[i]]
+
+    # (top [(member_id, visits)], {visits: members with that many}, members
+    # who visited at all) for the window
+    def member_frequency(self, since=None, until=None, top=25):
+        member, _ = self._window(since, until)
+        if not len(member):
+            return [], {}, 0
+        visits = np.bincount(member)
+        visited = np.flatnonzero(visits)
+        top = min(top, len(visited))
+        best = visited[np.argpartition(-visits[visited], top - 1)[:top]]
+        best = best[np.lexsort((best, -visits[best]))]
+        distribution = np.bincount(visits[visited])
+        return ([(int(m), int(visits[m])) for m in best],
+                {int(k): int(n) for k, n in enumerate(distribution) if n},
+                int(len(visited)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rows": int(len(self._member)),
+                "overlay": len(self._overlay),
+                "last_id": self._last_id,
+                "bytes": int(self._member.nbytes + self._minute.nbytes),
+            }
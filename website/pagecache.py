@@ -0,0 +1,138 @@
+# ======================================================================= #
+#                          RENDERED PAGE CACHE                            #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (pagecache.py) keeps the finished bytes of the personal site  #
+# pages (views.py), which only change on deploy. A @cached_page route     #
+# renders once per worker, after that every hit is a dict lookup:         #
+#                                                                         #
+#   - the body and a gzip copy, picked by Accept-Encoding                 #
+#   - an ETag per encoding, If-None-Match (weak comparison, so W/ tags    #
+#     from proxies that re-encode still match) -> 304 with no body        #
+#   - Cache-Control: no-cache, so browsers revalidate (cheap 304s)        #
+#                                                                         #
+# Everything is dropped when the deploy fingerprint changes:              #
+# DEPLOY_VERSION from the environment plus the newest mtime under         #
+# templates/ and of the asset / image manifests (they change the URLs in  #
+# the pages). It's checked at most every PAGE_CACHE_CHECK_INTERVAL        #
+# seconds (default 2).                                                    #
+# HEAD is answered like GET. Requests with a query string, other          #
+# methods and non-200s skip the cache.                                    #
+# PAGE_CACHE=0 turns it off.                                              #
+# ======================================================================= #
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from . import assets, images
+
+ENABLED = os.getenv("PAGE_CACHE", "1") == "1"
+CHECK_INTERVAL = float(os.getenv("PAGE_CACHE_CHECK_INTERVAL", 2))
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+CACHE_CONTROL = "public, no-cache"
+
+
+def _fingerprint():
+    newest = 0.0
+    for root, _, files in os.walk(TEMPLATE_DIR):
+        for filename in files:
+            newest = max(newest, os.path.getmtime(os.path.join(root, filename)))
+    for manifest in (assets.MANIFEST, images.MANIFEST):
+        if os.path.exists(manifest):
+            newest = max(newest, os.path.getmtime(manifest))
+    return os.getenv("DEPLOY_VERSION", ""), newest
+
+
+class _Page:
+    def __init__(self, response):
+        self.body = response.get_data()
+        self.gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:20]
+        self.etags = {None: f'"{digest}"', "gzip": f'"{digest}-gz"'}
+        # the whole header set per encoding, a hit only picks one
+        self.headers = {}
+        for encoding, etag in self.etags.items():
+            headers = [("Content-Type", response.content_type), ("ETag", etag),
+                       ("Cache-Control", CACHE_CONTROL), ("Vary", "Accept-Encoding")]
+            if encoding:
+                headers.append(("Content-Encoding", encoding))
+            self.headers[encoding] = headers
+
+    def respond(self):
+        encoding = "gzip" if request.accept_encodings["gzip"] else None
+        headers = self.headers[encoding]
+        if request.if_none_match.contains_weak(self.etags[encoding].strip('"')):
+            return current_app.response_class(status=304, headers=headers[1:])
+        return current_app.response_class(self.gzipped if encoding else self.body, headers=headers)
+
+
+class PageCache:
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._pages = {}        # path -> _Page
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self.hits = self.misses = 0
+
+    def _check(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            fingerprint = _fingerprint()
+            if fingerprint != self._fingerprint:
+                if self._fingerprint is not None:
+                    # jinja only rechecks template files in debug, make it
+                    # load the edited ones for the re-render
+                    current_app.jinja_env.cache.clear()
+                self._pages = {}
+                self._fingerprint = fingerprint
+            self._checked_at = now
+
+    def get(self, path):
+        self._check()
+        page = self._pages.get(path)
+        if page is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return page
+
+    def put(self, path, response):
+        page = _Page(response)
+        self._pages[path] = page
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages = {}
+
+    def stats(self):
+        return {"pages": len(self._pages), "hits": self.hits, "misses": self.misses,
+                "bytes": sum(len(p.body) + len(p.gzipped) for p in self._pages.values())}
+
+page_cache = PageCache()
+
+
+def cached_page(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ENABLED or request.method not in ("GET", "HEAD") or request.args:
+            return view(*args, **kwargs)
+        page = page_cache.get(request.path)
+        if page is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            page = page_cache.put(request.path, response)
+        return page.respond()
+    return wrapper
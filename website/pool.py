@@ -0,0 +1,249 @@
+# ======================================================================= #
+#                        GYMMAN: CONNECTION POOL                          #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (pool.py) keeps a pool of open MySQL connections so the db_*  #
+# models don't pay a TCP + auth handshake on every query. Inside a Flask  #
+# request get_db() hands out ONE pooled connection (stored on flask.g)    #
+# that every model call shares, and it goes back to the pool on teardown. #
+#                                                                         #
+# Tunables (db.env):                                                      #
+#   DB_POOL_SIZE          connections kept open             (default 5)   #
+#   DB_POOL_MAX_OVERFLOW  extra connections under load      (default 10)  #
+#   DB_POOL_RECYCLE       max connection age in seconds     (default 1800)#
+#   DB_POOL_TIMEOUT       seconds to wait for a free conn   (default 10)  #
+#   DB_POOL_LEAK_TIMEOUT  seconds before a held conn is     (default 60)  #
+#                         reported as leaked                              #
+# ======================================================================= #
+
+import logging
+import os
+import threading
+import time
+import traceback
+from collections import deque
+
+import mysql.connector
+from flask import g, has_app_context
+
+from .instrument import wrap_cursor
+
+log = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within DB_POOL_TIMEOUT."""
+
+
+class PooledConnection:
+    """Proxy around a raw mysql connection checked out of a ConnectionPool.
+
+    Everything is forwarded to the real connection except close(), which
+    hands the connection back to the pool instead of dropping it, and
+    cursor(), which comes back wrapped for SQL instrumentation. Request
+    scoped connections ignore close() entirely; release_request_connection()
+    returns them once the request is torn down.
+    """
+
+    def __init__(self, pool, raw, created_at, request_scoped=False):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._request_scoped = request_scoped
+        self._released = False
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise AttributeError(name)
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return wrap_cursor(self._raw.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._request_scoped:
+            return
+        self.release()
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self)
+
+    def __del__(self):
+        # a proxy garbage collected without being released is a leak
+        if not getattr(self, "_released", True):
+            log.warning("pooled connection garbage collected without release; reclaiming")
+            try:
+                self.release()
+            except Exception:
+                pass
+
+
+class ConnectionPool:
+    def __init__(self, connect_args, size=5, max_overflow=10, recycle=1800,
+                 timeout=10, leak_timeout=60):
+        self.connect_args = connect_args
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.leak_timeout = leak_timeout
+
+        self._idle = deque()        # (raw, created_at)
+        self._checked_out = {}      # id(proxy) -> (checkout time, stack, thread name)
+        self._num_open = 0
+        self._cond = threading.Condition()
+
+    # open a brand new raw connection. buffered so a shared connection never
+    # trips over an unread result left behind by a previous db_* call
+    def _connect(self):
+        return mysql.connector.connect(buffered=True, **self.connect_args)
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def checkout(self, request_scoped=False):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                while self._idle:
+                    raw, created_at = self._idle.pop()
+                    if self.recycle and time.monotonic() - created_at > self.recycle:
+                        self._discard(raw)
+                        self._num_open -= 1
+                        continue
+                    return self._hand_out(raw, created_at, request_scoped)
+
+                if self._num_open < self.size + self.max_overflow:
+                    self._num_open += 1
+                    break
+
+                self._report_leaks()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"no database connection available after {self.timeout}s "
+                        f"({self._num_open} open, {len(self._checked_out)} checked out)"
+                    )
+                self._cond.wait(remaining)
+
+        # connect outside the lock so a slow handshake doesn't block releases
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._num_open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            return self._hand_out(raw, time.monotonic(), request_scoped)
+
+    def _hand_out(self, raw, created_at, request_scoped):
+        proxy = PooledConnection(self, raw, created_at, request_scoped)
+        self._checked_out[id(proxy)] = (
+            time.monotonic(),
+            "".join(traceback.format_stack(limit=8)[:-3]),
+            threading.current_thread().name,
+        )
+        return proxy
+
+    def _release(self, proxy):
+        raw = proxy._raw
+        healthy = True
+        try:
+            # end any open transaction so the next borrower gets a fresh
+            # snapshot and nothing half-written leaks across requests
+            raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._checked_out.pop(id(proxy), None)
+            too_old = self.recycle and time.monotonic() - proxy._created_at > self.recycle
+            if healthy and not too_old and len(self._idle) < self.size:
+                self._idle.append((raw, proxy._created_at))
+            else:
+                self._discard(raw)
+                self._num_open -= 1
+            self._cond.notify()
+
+    def _report_leaks(self):
+        if not self.leak_timeout:
+            return
+        now = time.monotonic()
+        for held_since, stack, thread_name in self._checked_out.values():
+            if now - held_since > self.leak_timeout:
+                log.warning(
+                    "database connection held for %.0fs by thread %s (possible leak), "
+                    "checked out at:\n%s", now - held_since, thread_name, stack
+                )
+
+    def check_leaks(self):
+        with self._cond:
+            self._report_leaks()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "open": self._num_open,
+                "idle": len(self._idle),
+                "checked_out": len(self._checked_out),
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+            }
+
+    def dispose(self):
+        with self._cond:
+            while self._idle:
+                raw, _ = self._idle.pop()
+                self._discard(raw)
+                self._num_open -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    connect_args=dict(
+                        host=os.getenv("DB_HOST", "localhost"),
+                        user=os.getenv("DB_USER"),
+                        password=os.getenv("DB_PASS"),
+                        database=os.getenv("DB_NAME"),
+                    ),
+                    size=int(os.getenv("DB_POOL_SIZE", 5)),
+                    max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", 10)),
+                    recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                    leak_timeout=float(os.getenv("DB_POOL_LEAK_TIMEOUT", 60)),
+                )
+    return _pool
+
+# returns the connection for the current request (checked out on first use),
+# or a standalone pooled connection when called outside of a request
+def get_connection():
+    if has_app_context():
+        conn = g.get("_gymman_db")
+        if conn is None:
+            conn = get_pool().checkout(request_scoped=True)
+            g._gymman_db = conn
+        return conn
+    return get_pool().checkout()
+
+def release_request_connection(exc=None):
+    conn = g.pop("_gymman_db", None)
+    if conn is not None:
+        conn.release()
+
+def init_app(app):
+    app.teardown_appcontext(release_request_connection)
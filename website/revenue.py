@@ -0,0 +1,111 @@
+# ======================================================================= #
+#                         GYMMAN: REVENUE INDEX                           #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (revenue.py) answers "how much came in between X and Y" in    #
+# constant time. It loads the RevenueDaily rollup (one row per day,       #
+# status and payment type, kept current by db_addPayment and              #
+# db_updatePaymentStatus) into prefix-sum arrays, one per (status, type)  #
+# plus one per status across all types:                                   #
+#                                                                         #
+#   total(a..b) = prefix[b + 1] - prefix[a]                               #
+#                                                                         #
+# Amounts are kept in integer cents so sums stay exact. The index is      #
+# rebuilt from the rollup (not Payments) when a write invalidates it or   #
+# after REVENUE_INDEX_TTL seconds, to pick up other workers' writes.      #
+# ======================================================================= #
+
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+BUCKETS = ("day", "week", "month")
+
+
+class RevenueIndex:
+    def __init__(self, loader, ttl=60):
+        # loader() -> iterable of (day, status, type, total, payments)
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._built_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _build(self):
+        rows = list(self._loader())
+        first = min((row[0] for row in rows), default=date.today())
+        self._first = first.toordinal()
+        days = max(date.today().toordinal(), max((row[0].toordinal() for row in rows),
+                                                 default=0)) - self._first + 1
+        cents, counts = {}, {}
+        for day, status, payment_type, total, payments in rows:
+            i = day.toordinal() - self._first
+            for key in ((status, payment_type), (status, None)):
+                if key not in cents:
+                    cents[key] = np.zeros(days + 1, dtype=np.int64)
+                    counts[key] = np.zeros(days + 1, dtype=np.int64)
+                cents[key][i + 1] += int(round(total * 100))
+                counts[key][i + 1] += payments
+        self._cents = {k: np.cumsum(v) for k, v in cents.items()}
+        self._counts = {k: np.cumsum(v) for k, v in counts.items()}
+        self._days = days
+        self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+                self._build()
+            return self._cents, self._counts, self._first, self._days
+
+    @staticmethod
+    def _sum(arrays, start, end, status, payment_type, first, days):
+        prefix = arrays.get((status, payment_type))
+        # prefix[k] is the sum over the first k days, clamp to what's loaded
+        lo = min(max(start.toordinal() - first, 0), days)
+        hi = min(max(end.toordinal() - first + 1, 0), days)
+        if prefix is None or hi <= lo:
+            return 0
+        return int(prefix[hi] - prefix[lo])
+
+    # (total, number of payments) between start and end, both inclusive
+    def total(self, start=None, end=None, status="complete", payment_type=None):
+        cents, counts, first, days = self._ensure_fresh()
+        start = start or date.fromordinal(first)
+        end = end or date.fromordinal(first + days - 1)
+        if end < start:
+            return 0.0, 0
+        return (self._sum(cents, start, end, status, payment_type, first, days) / 100,
+                self._sum(counts, start, end, status, payment_type, first, days))
+
+    # [{"period": first day, "total": ..., "payments": ...}] per day / week
+    # (starting Monday) / month, one O(1) range sum per bucket
+    def series(self, start, end, bucket="day", status="complete", payment_type=None):
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        cents, counts, first, days = self._ensure_fresh()
+        out = []
+        period = start
+        if bucket == "week":
+            period = start - timedelta(days=start.weekday())
+        elif bucket == "month":
+            period = start.replace(day=1)
+        while period <= end:
+            if bucket == "day":
+                following = period + timedelta(days=1)
+            elif bucket == "week":
+                following = period + timedelta(days=7)
+            else:
+                following = (period.replace(day=28) + timedelta(days=4)).replace(day=1)
+            lo, hi = max(period, start), min(following - timedelta(days=1), end)
+            out.append({
+                "period": period.isoformat(),
+                "total": self._sum(cents, lo, hi, status, payment_type, first, days) / 100,
+                "payments": self._sum(counts, lo, hi, status, payment_type, first, days),
+            })
+            period = following
+        return out
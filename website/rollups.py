@@ -0,0 +1,93 @@
+# ======================================================================= #
+#                       GYMMAN: EXERCISE ROLLUP CHECK                     #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (rollups.py) checks the MemberExerciseStats rollups (kept up  #
+# to date by db_logExercise / db_modifyExercise / db_deleteExercise)      #
+# against the raw Exercises / Strength_Exercises / Cardio_Exercises /     #
+# Runs rows, and rebuilds them. Anything written to those tables behind   #
+# the app's back (imports, hand edits) shows up here as drift.            #
+#                                                                         #
+# Usage (uses the same db.env as the app):                                #
+#   python -m website.rollups              verify, exit 1 on any drift    #
+#   python -m website.rollups --fix        rebuild only drifted members   #
+#   python -m website.rollups --rebuild    rebuild every member           #
+# ======================================================================= #
+
+import sys
+from decimal import Decimal
+
+from .models import get_db, EXERCISE_ROLLUP_COLUMNS, EXERCISE_ROLLUP_SQL, _refreshExerciseRollup
+
+
+def _comparable(value):
+    if isinstance(value, (Decimal, float)):
+        return round(float(value), 3)
+    return value
+
+def _load(cursor, sql):
+    cursor.execute(sql)
+    return {row["member_id"]: tuple(_comparable(row[c]) for c in EXERCISE_ROLLUP_COLUMNS)
+            for row in cursor.fetchall()}
+
+# [(member_id, stored, expected)] for every member whose rollup is off.
+# None on either side means the row is missing there
+def verify():
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    expected = _load(cursor, EXERCISE_ROLLUP_SQL.format(where=""))
+    stored = _load(cursor, f"""
+        SELECT member_id, {", ".join(EXERCISE_ROLLUP_COLUMNS)}
+        FROM MemberExerciseStats
+        WHERE workouts > 0
+    """)
+    cursor.close()
+    db.close()
+    return [(member_id, stored.get(member_id), expected.get(member_id))
+            for member_id in sorted(expected.keys() | stored.keys())
+            if stored.get(member_id) != expected.get(member_id)]
+
+# recompute the given members' rollups, or every member's, in one transaction
+def rebuild(member_ids=None):
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        if member_ids is None:
+            cursor.execute("DELETE FROM MemberExerciseStats")
+            cursor.execute(f"""
+                INSERT INTO MemberExerciseStats (member_id, {", ".join(EXERCISE_ROLLUP_COLUMNS)})
+                {EXERCISE_ROLLUP_SQL.format(where="")}
+            """)
+        else:
+            for member_id in member_ids:
+                _refreshExerciseRollup(cursor, member_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+        db.close()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--rebuild" in argv:
+        rebuild()
+        print("rebuilt every member's exercise rollup.")
+        return 0
+
+    drift = verify()
+    for member_id, stored, expected in drift:
+        print(f"member {member_id}: stored {stored} != expected {expected}")
+    if not drift:
+        print("exercise rollups match the raw data.")
+        return 0
+    if "--fix" in argv:
+        rebuild([member_id for member_id, _, _ in drift])
+        print(f"rebuilt {len(drift)} drifted member rollup(s).")
+        return 0
+    print(f"{len(drift)} member rollup(s) out of date, run with --fix to rebuild them.")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# ======================================================================= #
+#                        GYMMAN: MEMBER SEARCH INDEX                      #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (search.py) holds an in-process index over member names,      #
+# emails and phone numbers so the front desk lookup doesn't have to run   #
+# five leading-wildcard LIKEs (a full scan of Members + joins) per search.#
+#                                                                         #
+#   - prefix matches come from a sorted token list (bisect)               #
+#   - substring matches come from a trigram -> member_id posting index    #
+#   - every term in the query has to match (so "jo smi" works)            #
+#   - results are ranked: exact token > prefix > substring                #
+#                                                                         #
+# The index is built from the DB on first use and kept current by the     #
+# models that create / change / delete members (see member_index in       #
+# models.py). Since every gunicorn worker has its own copy it's also      #
+# rebuilt in the background once it is older than SEARCH_INDEX_MAX_AGE    #
+# seconds, to pick up other workers' writes.                              #
+# ======================================================================= #
+
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+_SPLIT = re.compile(r"[\s,]+")
+_NOT_DIGIT = re.compile(r"\D")
+_PHONE_LIKE = re.compile(r"[\d\s()+.-]+")
+
+EXACT, PREFIX, SUBSTRING = 3, 2, 1
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# trigrams worth indexing for a token. full emails are left out (their local
+# part is its own token), otherwise every member lands in the "mai"/"com"
+# postings and both build time and memory balloon
+def _token_grams(token):
+    return _trigrams(token) if "@" not in token else ()
+
+def _tokens(first_name, last_name, email, phones):
+    tokens = []
+    for part in (first_name, last_name):
+        tokens.extend(t for t in _SPLIT.split((part or "").lower()) if t)
+    if email:
+        email = email.lower()
+        tokens.append(email)
+        tokens.append(email.split("@", 1)[0])
+    for phone in phones:
+        digits = _NOT_DIGIT.sub("", phone or "")
+        if digits:
+            tokens.append(digits)
+    return tuple(dict.fromkeys(tokens))
+
+
+class MemberIndex:
+    def __init__(self, loader, max_age=300):
+        # loader() -> iterable of (member_id, first_name, last_name, email, [phones])
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._rebuilding = False
+        self._journal = None    # writes that land while a rebuild is loading
+        self._reset()
+
+    def _reset(self):
+        self._docs = {}                 # member_id -> (tokens, sort key)
+        self._grams = defaultdict(set)  # trigram -> {member_id}
+        self._prefix = []               # sorted [(token, member_id)]
+        self._built_at = None
+
+    # ---------- building ----------
+    def build(self):
+        with self._lock:
+            self._journal = []
+        try:
+            rows = list(self._loader())
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        docs, grams, prefix = {}, defaultdict(set), []
+        for member_id, first_name, last_name, email, phones in rows:
+            tokens = _tokens(first_name, last_name, email, phones)
+            docs[member_id] = (tokens, ((last_name or "").lower(), (first_name or "").lower()))
+            for token in tokens:
+                prefix.append((token, member_id))
+                for gram in _token_grams(token):
+                    grams[gram].add(member_id)
+        prefix.sort()
+        with self._lock:
+            self._docs, self._grams, self._prefix = docs, grams, prefix
+            self._built_at = time.monotonic()
+            # replay anything written after the loader read its snapshot
+            journal, self._journal = self._journal, None
+            for op, args in journal:
+                op(*args)
+        log.info("member search index built: %d members, %d trigrams", len(docs), len(grams))
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            with self._lock:
+                if self._built_at is None:
+                    self.build()
+            return
+        if self.max_age and time.monotonic() - self._built_at > self.max_age:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+            threading.Thread(target=self._background_rebuild, daemon=True).start()
+
+    def _background_rebuild(self):
+        try:
+            self.build()
+        except Exception:
+            log.exception("member search index rebuild failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    # ---------- incremental updates ----------
+    def upsert(self, member_id, first_name, last_name, email, phones=()):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((self._upsert, (member_id, first_name, last_name, email, phones)))
+            if self.is_built:
+                self._upsert(member_id, first_name, last_name, email, phones)
+            # not built yet: the first search loads it from the DB anyway
+
+    def _upsert(self, member_id, first_name, last_name, email, phones):
+        self._remove(member_id)
+        tokens = _tokens(first_name, last_name, email, phones)
+        self._docs[member_id] = (tokens, ((last_name or "").lower(), (first_name or "").lower()))
+        for token in tokens:
+            bisect.insort(self._prefix, (token, member_id))
+            for gram in _token_grams(token):
+                self._grams[gram].add(member_id)
+
+    def remove(self, member_id):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((self._remove, (member_id,)))
+            if self.is_built:
+                self._remove(member_id)
+
+    def _remove(self, member_id):
+        doc = self._docs.pop(member_id, None)
+        if doc is None:
+            return
+        for token in doc[0]:
+            i = bisect.bisect_left(self._prefix, (token, member_id))
+            if i < len(self._prefix) and self._prefix[i] == (token, member_id):
+                del self._prefix[i]
+            for gram in _token_grams(token):
+                ids = self._grams.get(gram)
+                if ids is not None:
+                    ids.discard(member_id)
+                    if not ids:
+                        del self._grams[gram]
+
+    # ---------- querying ----------
+    def _match_term(self, term):
+        scores = {}
+        # exact + prefix matches off the sorted token list
+        i = bisect.bisect_left(self._prefix, (term,))
+        while i < len(self._prefix) and self._prefix[i][0].startswith(term):
+            token, member_id = self._prefix[i]
+            score = EXACT if token == term else PREFIX
+            if score > scores.get(member_id, 0):
+                scores[member_id] = score
+            i += 1
+        # substring matches: members holding every trigram of the term,
+        # confirmed against the actual tokens
+        if len(term) >= 3:
+            postings = [self._grams.get(g) for g in _trigrams(term)]
+            candidates = set()
+            if all(postings):
+                postings.sort(key=len)
+                candidates = set(postings[0])
+                for ids in postings[1:]:
+                    candidates &= ids
+                    if not candidates:
+                        break
+            for member_id in candidates:
+                if member_id in scores:
+                    continue
+                if any(term in token for token in self._docs[member_id][0]):
+                    scores[member_id] = SUBSTRING
+        return scores
+
+    # ranked member_ids matching `query`, best first
+    def search(self, query, limit=25):
+        query = (query or "").strip().lower()
+        if not query:
+            return []
+        self._ensure_fresh()
+
+        terms = [t for t in _SPLIT.split(query) if t]
+        digits = _NOT_DIGIT.sub("", query)
+        if digits and _PHONE_LIKE.fullmatch(query):
+            # looks like a phone number, "(555) 123-4567" -> one digit term
+            terms = [digits]
+
+        with self._lock:
+            total = None
+            for term in terms:
+                scores = self._match_term(term)
+                if total is None:
+                    total = scores
+                else:
+                    total = {m: total[m] + s for m, s in scores.items() if m in total}
+                if not total:
+                    break
+            total = total or {}
+
+            # a bare number is also a member_id, and that beats everything
+            if query.isdigit():
+                member_id = int(query)
+                if member_id in self._docs:
+                    total[member_id] = float("inf")
+
+            return heapq.nsmallest(limit, total, key=lambda m: (-total[m], self._docs[m][1], m))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "members": len(self._docs),
+                "trigrams": len(self._grams),
+                "tokens": len(self._prefix),
+                "age": None if self._built_at is None else time.monotonic() - self._built_at,
+            }
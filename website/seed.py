@@ -0,0 +1,280 @@
+# ======================================================================= #
+#                        GYMMAN: SYNTHETIC DATA SEEDER                    #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (seed.py) fills a LOCAL database with fake but realistic      #
+# data for benchmarks (bench.py), plan checks (explain.py) and load tests #
+# -- never point it at the real gym. Per member, on average:              #
+#                                                                         #
+#   --checkins   visits, weighted towards the 6-9am / 4-8pm rush          #
+#   --payments   payments, mostly complete, some pending / failed         #
+#   --exercises  workouts, ~60% strength with slowly rising weights,      #
+#                the rest timed runs                                      #
+#   --phones / --contacts   phone numbers / emergency contacts            #
+#   --assigned   share of members with a trainer (--trainers of them)     #
+#                                                                         #
+# Rows go in with multi-row INSERTs and one commit per --batch members.   #
+# Ids are assigned here, continuing after the current MAX(id), so running #
+# it again grows the dataset. Afterwards the rollup tables are rebuilt.   #
+# It also creates seed-owner / seed-staff / seed-trainer logins and a     #
+# memberN login per member, all with --password.                          #
+#                                                                         #
+# Usage (uses the same db.env as the app, run the migrations first):      #
+#   python -m website.seed --members 10000 [--checkins 40] [--payments 12]#
+#          [--exercises 30] [--trainers 20] [--seed 42] [--years 3]       #
+# ======================================================================= #
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from .models import get_db, REVENUE_ROLLUP_SQL
+from . import rollups
+
+FIRST_NAMES = ("James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+               "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+               "Thomas", "Sarah", "Charles", "Karen", "Daniel", "Nancy", "Matthew", "Lisa",
+               "Anthony", "Betty", "Mark", "Sandra", "Isaac", "Ashley", "Steven", "Emily")
+LAST_NAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+              "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson",
+              "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Stephens")
+LIFTS = (("Bench Press", 60), ("Squat", 80), ("Deadlift", 100), ("Overhead Press", 35),
+         ("Barbell Row", 50), ("Pull Up", 10))
+SPECIALITIES = ("Strength", "Cardio", "Powerlifting", "Mobility", "Weight Loss")
+RELATIONSHIPS = ("Spouse", "Parent", "Sibling", "Friend")
+PAYMENT_TYPES = (("membership", 0.8, 45), ("personal_training", 0.15, 60), ("merchandise", 0.05, 25))
+STATUSES = (("complete", 0.9), ("pending", 0.07), ("failed", 0.03))
+# relative check-in traffic per hour of the day
+HOUR_WEIGHTS = (0, 0, 0, 0, 1, 4, 9, 10, 7, 4, 3, 3, 4, 3, 2, 3, 6, 9, 10, 8, 5, 3, 1, 0)
+
+
+def _around(rng, mean):
+    return max(0, int(round(rng.gauss(mean, mean / 3)))) if mean else 0
+
+def _count(rng, ratio):
+    # ratio 1.3 -> one, plus a second 30% of the time
+    return int(ratio) + (rng.random() < ratio - int(ratio))
+
+def _weighted(rng, choices):
+    return rng.choices([c[0] for c in choices], weights=[c[1] for c in choices])[0]
+
+def _next_ids(cursor):
+    ids = {}
+    for table, column in (("Members", "member_id"), ("Staff", "staff_id"),
+                          ("Exercises", "exercise_id"), ("Cardio_Exercises", "cardio_id")):
+        cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+        ids[table] = cursor.fetchone()[0]
+    return ids
+
+
+class _Rows:
+    """Rows for one batch, grouped by the INSERT they belong to."""
+
+    SQL = {
+        "members": "INSERT INTO Members (member_id, first_name, last_name, birth_date, "
+                   "membership_start_date, email, sex) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        "users": "INSERT INTO users (username, password_hash, role_id, first_name, last_name, email) "
+                 "VALUES (%s, %s, %s, %s, %s, %s)",
+        "phones": "INSERT INTO PhoneNumbers (member_id, phone_number, phone_number_type) "
+                  "VALUES (%s, %s, %s)",
+        "contacts": "INSERT INTO EmergencyContacts (member_id, first_name, last_name, "
+                    "relationship, phone_number, email) VALUES (%s, %s, %s, %s, %s, %s)",
+        "clients": "INSERT INTO TrainerClients (trainer_id, member_id, client_start_date, "
+                   "client_end_date, notes) VALUES (%s, %s, %s, %s, %s)",
+        "checkins": "INSERT INTO Checkins (member_id, checkin_datetime) VALUES (%s, %s)",
+        "payments": "INSERT INTO Payments (member_id, amount, payment_date, status, type) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+        "exercises": "INSERT INTO Exercises (exercise_id, member_id, exercise_name, rpe, "
+                     "exercise_date) VALUES (%s, %s, %s, %s, %s)",
+        "strength": "INSERT INTO Strength_Exercises (exercise_id, strength_id, exercise_weight, "
+                    "weight_unit, num_sets, num_repetitions, notes) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        "cardio": "INSERT INTO Cardio_Exercises (cardio_id, exercise_id, avg_hr, time_taken) "
+                  "VALUES (%s, %s, %s, %s)",
+        "runs": "INSERT INTO Runs (cardio_id, distance_unit, distance, laps) VALUES (%s, %s, %s, %s)",
+    }
+
+    def __init__(self):
+        self.rows = {name: [] for name in self.SQL}
+
+    def write(self, cursor, totals):
+        # parents first, the order of SQL above
+        for name, sql in self.SQL.items():
+            rows = self.rows[name]
+            for i in range(0, len(rows), 5000):
+                cursor.executemany(sql, rows[i:i + 5000])
+            totals[name] = totals.get(name, 0) + len(rows)
+
+
+def _member(rng, out, ids, member_id, today, args, trainers, pw_hash):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    email = f"{first}.{last}.{member_id}@example.com".lower()
+    birth = today - timedelta(days=rng.randint(16 * 365, 70 * 365))
+    start = today - timedelta(days=rng.randint(0, args.years * 365))
+    days_member = (today - start).days + 1
+    out.rows["members"].append((member_id, first, last, birth, start, email, rng.choice("MF")))
+    out.rows["users"].append((f"member{member_id}", pw_hash, 3, first, last, email))
+
+    for _ in range(_count(rng, args.phones)):
+        out.rows["phones"].append((member_id, f"555{rng.randint(0, 9999999):07d}",
+                                   rng.choice(("mobile", "home", "work"))))
+    for _ in range(_count(rng, args.contacts)):
+        out.rows["contacts"].append((member_id, rng.choice(FIRST_NAMES), last,
+                                     rng.choice(RELATIONSHIPS), f"555{rng.randint(0, 9999999):07d}",
+                                     None))
+    if trainers and rng.random() < args.assigned:
+        client_start = start + timedelta(days=rng.randint(0, days_member - 1))
+        ended = rng.random() < 0.3 and client_start < today - timedelta(days=30)
+        out.rows["clients"].append((rng.choice(trainers), member_id, client_start,
+                                    client_start + timedelta(days=rng.randint(14, 180)) if ended else None,
+                                    None))
+
+    for _ in range(_around(rng, args.checkins)):
+        day = start + timedelta(days=rng.randrange(days_member))
+        hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+        out.rows["checkins"].append(
+            (member_id, datetime(day.year, day.month, day.day, hour, rng.randrange(60), rng.randrange(60))))
+
+    for _ in range(_around(rng, args.payments)):
+        payment_type = _weighted(rng, PAYMENT_TYPES)
+        base = next(p[2] for p in PAYMENT_TYPES if p[0] == payment_type)
+        out.rows["payments"].append((member_id, round(base * rng.uniform(0.8, 1.5), 2),
+                                     start + timedelta(days=rng.randrange(days_member)),
+                                     _weighted(rng, STATUSES), payment_type))
+
+    workouts = sorted(start + timedelta(days=rng.randrange(days_member))
+                      for _ in range(_around(rng, args.exercises)))
+    strength = rng.uniform(0.6, 1.4)
+    for n, day in enumerate(workouts):
+        exercise_id = ids["Exercises"]
+        ids["Exercises"] += 1
+        progress = 1 + 0.4 * n / max(len(workouts), 1)      # ~40% stronger over the period
+        if rng.random() < 0.6:
+            lift, base = rng.choice(LIFTS)
+            out.rows["exercises"].append((exercise_id, member_id, lift, rng.randint(5, 10), day))
+            out.rows["strength"].append((exercise_id, exercise_id,
+                                         round(base * strength * progress / 2.5) * 2.5, "kg",
+                                         rng.randint(3, 5), rng.choice((1, 3, 5, 8, 10, 12)), None))
+        else:
+            cardio_id = ids["Cardio_Exercises"]
+            ids["Cardio_Exercises"] += 1
+            km = round(rng.uniform(2, 12), 2)
+            seconds = int(km * rng.uniform(270, 420) / progress ** 0.5)
+            out.rows["exercises"].append((exercise_id, member_id, "Run", rng.randint(4, 9), day))
+            out.rows["cardio"].append((cardio_id, exercise_id, rng.randint(120, 175),
+                                       f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"))
+            out.rows["runs"].append((cardio_id, "km", km, None))
+
+def _staff(cursor, rng, ids, args, today, pw_hash):
+    trainers = []
+    for i in range(args.trainers):
+        staff_id = ids["Staff"]
+        ids["Staff"] += 1
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        cursor.execute("""
+            INSERT INTO Staff (staff_id, ssn, first_name, last_name, employment_date,
+                               birth_date, staff_address)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (staff_id, f"900-{staff_id // 10000 % 100:02d}-{staff_id % 10000:04d}", first, last,
+              today - timedelta(days=rng.randint(30, args.years * 365)),
+              today - timedelta(days=rng.randint(20 * 365, 50 * 365)), f"{staff_id} Seed St"))
+        cursor.execute("INSERT INTO Hourly_Employees VALUES (%s, %s)",
+                       (staff_id, round(rng.uniform(18, 40), 2)))
+        cursor.execute("INSERT INTO Trainers (staff_id, speciality, active) VALUES (%s, %s, %s)",
+                       (staff_id, rng.choice(SPECIALITIES), int(rng.random() < 0.9)))
+        trainers.append((staff_id, first, last))
+
+    # fixed logins for the load test / manual poking, once per database
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username LIKE 'seed-%'")
+    if not cursor.fetchone()[0]:
+        logins = [("seed-owner", 1, "Seed", "Owner", None), ("seed-staff", 2, "Seed", "Staff", None)]
+        if trainers:
+            staff_id, first, last = trainers[0]
+            logins.append(("seed-trainer", 4, first, last, staff_id))
+        cursor.executemany("""
+            INSERT INTO users (username, password_hash, role_id, first_name, last_name, email, staff_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [(u, pw_hash, role, f, l, f"{u}@example.com", s) for u, role, f, l, s in logins])
+    return [t[0] for t in trainers]
+
+def seed(members, checkins=40, payments=12, exercises=30, phones=1.2, contacts=0.8,
+         trainers=10, assigned=0.3, years=3, batch=1000, password="password", rng_seed=42,
+         progress=None):
+    """Add `members` members (and everything hanging off them), returns row counts."""
+    args = argparse.Namespace(checkins=checkins, payments=payments, exercises=exercises,
+                              phones=phones, contacts=contacts, trainers=trainers,
+                              assigned=assigned, years=years)
+    rng = random.Random(rng_seed)
+    today = date.today()
+    pw_hash = generate_password_hash(password)     # once, hashing is the slow part
+    totals = {}
+    started = time.monotonic()
+
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        ids = _next_ids(cursor)
+        # re-seeding adds new trainers, don't reuse the rng stream of the last run
+        rng.seed(f"{rng_seed}-{ids['Members']}")
+        trainer_ids = _staff(cursor, rng, ids, args, today, pw_hash)
+        db.commit()
+
+        done = 0
+        while done < members:
+            out = _Rows()
+            for _ in range(min(batch, members - done)):
+                member_id = ids["Members"]
+                ids["Members"] += 1
+                _member(rng, out, ids, member_id, today, args, trainer_ids, pw_hash)
+                done += 1
+            out.write(cursor, totals)
+            db.commit()
+            if progress:
+                progress(done, members, time.monotonic() - started)
+
+        # the write paths keep these current, bulk rows have to be folded in
+        cursor.execute("DELETE FROM RevenueDaily")
+        cursor.execute(REVENUE_ROLLUP_SQL)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+        db.close()
+    rollups.rebuild()
+    return totals
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a LOCAL database with synthetic gym data.")
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--checkins", type=float, default=40, help="avg check-ins per member")
+    parser.add_argument("--payments", type=float, default=12, help="avg payments per member")
+    parser.add_argument("--exercises", type=float, default=30, help="avg workouts per member")
+    parser.add_argument("--phones", type=float, default=1.2, help="phone numbers per member")
+    parser.add_argument("--contacts", type=float, default=0.8, help="emergency contacts per member")
+    parser.add_argument("--trainers", type=int, default=10)
+    parser.add_argument("--assigned", type=float, default=0.3,
+                        help="share of members with a trainer")
+    parser.add_argument("--years", type=int, default=3, help="history spread over this many years")
+    parser.add_argument("--batch", type=int, default=1000, help="members per commit")
+    parser.add_argument("--password", default="password", help="password for every seeded login")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    args = parser.parse_args(argv)
+
+    def progress(done, total, elapsed):
+        print(f"{done}/{total} members ({done / elapsed:.0f}/s)", file=sys.stderr)
+
+    totals = seed(args.members, args.checkins, args.payments, args.exercises, args.phones,
+                  args.contacts, args.trainers, args.assigned, args.years, args.batch,
+                  args.password, args.seed, progress)
+    print("seeded: " + ", ".join(f"{n} {name}" for name, n in totals.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+// "Load More" for the recent check-ins tables. Asks the server for the next
+// page of rows after the last check-in shown (keyset cursor) and appends
+// just those rows, so every click costs the same no matter how far down
+// the list you are.
+document.querySelectorAll("[data-checkins-more]").forEach(function (button) {
+  var tbody = document.getElementById(button.dataset.target);
+
+  button.addEventListener("click", function () {
+    var cursor = button.dataset.cursor;
+    if (!cursor) {
+      return;
+    }
+    button.disabled = true;
+    fetch(button.dataset.url + "?before=" + encodeURIComponent(cursor), {
+      credentials: "same-origin"
+    })
+      .then(function (resp) {
+        if (!resp.ok) {
+          throw new Error(resp.status);
+        }
+        button.dataset.cursor = resp.headers.get("X-Next-Cursor") || "";
+        return resp.text();
+      })
+      .then(function (rows) {
+        tbody.insertAdjacentHTML("beforeend", rows);
+        if (button.dataset.cursor) {
+          button.disabled = false;
+        } else {
+          button.textContent = "No more check-ins";
+        }
+      })
+      .catch(function () {
+        button.disabled = false;
+      });
+  });
+});
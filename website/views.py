@@ -4,9 +4,12 @@
 
 from flask import Blueprint, render_template
 
+from .pagecache import cached_page
+
 views = Blueprint('views', __name__)
 
 @views.route('/')
+@cached_page
 def home():
     return render_template("home.html")
 
@@ -14,17 +17,21 @@ def home():
 # ======= Articles =======
 # ++++++++++++++++++++++++
 @views.route('/about-me')
+@cached_page
 def about_me():
     return render_template("resume.html")
 
 @views.route('/my-homelab')
+@cached_page
 def lab():
     return render_template("homelab.html")
 
 @views.route('/comparative-analysis-of-linux-scheduling')
+@cached_page
 def cs3800finalpaper():
     return render_template("articles/CS3800_FinalProject.html")
 
 @views.route('/bsu_mc')
+@cached_page
 def bsu_mc():
     return render_template("bsu_mc.html")
\ No newline at end of file
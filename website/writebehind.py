@@ -0,0 +1,191 @@
+# ======================================================================= #
+#                      GYMMAN: WRITE-BEHIND BUFFER                        #
+#                          Author: Isaac Stephens                         #
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ #
+# This file (writebehind.py) lets a request hand rows off to an in-memory #
+# bounded buffer instead of waiting on INSERT + COMMIT. A background      #
+# thread flushes the buffer in batches once it holds `batch_size` rows or #
+# `interval` seconds have passed, and once more on shutdown.              #
+#                                                                         #
+#   - put() blocks for at most `put_timeout` when the buffer is full      #
+#     (back-pressure) and returns False if there's still no room, so the  #
+#     caller can fall back to a synchronous write                         #
+#   - rows stay visible through snapshot() until their batch commits,     #
+#     so readers can merge them into what they pull from the DB           #
+#   - a failed flush puts the batch back and retries after a backoff      #
+#     (`backoff` seconds, doubling up to `max_backoff`). After            #
+#     `max_attempts` failures in a row the batch is split and written row #
+#     by row; rows that still fail are logged in full and dropped, so one #
+#     bad row can't wedge everything queued behind it                     #
+# ======================================================================= #
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    def __init__(self, writer, max_size=1000, batch_size=100, interval=1.0,
+                 put_timeout=0.5, enabled=True, max_attempts=5, backoff=0.5,
+                 max_backoff=30.0):
+        # writer(list_of_entries) persists + commits one batch, raising on failure
+        self._writer = writer
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.put_timeout = put_timeout
+        self.enabled = enabled
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._pending = deque()
+        self._inflight = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._atexit_registered = False
+        self._failures = 0          # failed flushes in a row
+        self._retry_at = 0.0        # monotonic time the next flush may run
+        self.dropped = 0
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="write-behind-flusher", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    # queue one entry; False means "full or disabled, write it yourself"
+    def put(self, entry):
+        if not self.enabled:
+            return False
+        deadline = time.monotonic() + self.put_timeout
+        with self._cond:
+            self._start()
+            while len(self._pending) >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    # everything not committed yet, oldest first
+    def snapshot(self):
+        with self._cond:
+            return list(self._inflight) + list(self._pending)
+
+    def _take_batch(self):
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popleft())
+        self._inflight = batch
+        return batch
+
+    def _flush_once(self):
+        with self._flush_lock:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return True
+            try:
+                self._writer(batch)
+            except Exception:
+                self._failures += 1
+                if self._failures >= self.max_attempts:
+                    log.exception("write-behind flush of %d rows failed %d times, "
+                                  "writing them one by one", len(batch), self._failures)
+                    self._write_rows(batch)
+                    return True
+                delay = min(self.backoff * 2 ** (self._failures - 1), self.max_backoff)
+                log.exception("write-behind flush of %d rows failed, retrying in %.1fs",
+                              len(batch), delay)
+                with self._cond:
+                    self._pending.extendleft(reversed(batch))
+                    self._inflight = []
+                    self._retry_at = time.monotonic() + delay
+                return False
+            with self._cond:
+                self._inflight = []
+                self._failures = 0
+                self._retry_at = 0.0
+                self._cond.notify_all()     # wake producers waiting for room
+            return True
+
+    # last resort for a batch that keeps failing: whatever still fails on its
+    # own is logged (so it can be replayed by hand) and dropped
+    def _write_rows(self, batch):
+        for entry in list(batch):
+            try:
+                self._writer([entry])
+            except Exception:
+                self.dropped += 1
+                log.error("write-behind dropped a row that can't be written: %r", entry,
+                          exc_info=True)
+            with self._cond:
+                self._inflight.remove(entry)
+        with self._cond:
+            self._failures = 0
+            self._retry_at = 0.0
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # wait for a full batch or the interval, but never flush
+                # before a failed batch's backoff is over
+                deadline = max(time.monotonic() + self.interval, self._retry_at)
+                while not self._stopping and time.monotonic() < deadline:
+                    if len(self._pending) >= self.batch_size and \
+                            time.monotonic() >= self._retry_at:
+                        break
+                    self._cond.wait(max(deadline - time.monotonic(), 0))
+                stopping = self._stopping
+            # drain in batch_size chunks, stop early if the DB is failing
+            while self._pending:
+                if not self._flush_once():
+                    break
+            if stopping:
+                return
+
+    # flush everything still buffered (called at interpreter exit)
+    def flush(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    return
+            if not self._flush_once():
+                return
+
+    def stop(self, timeout=10):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+        if self._pending:
+            log.error("write-behind buffer shut down with %d unwritten rows", len(self._pending))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "inflight": len(self._inflight),
+                "max_size": self.max_size,
+                "failures": self._failures,
+                "dropped": self.dropped,
+            }